@@ -21,11 +21,14 @@ if __name__ == '__main__':
                     help='clear all previously saved custom RPC servers')
     parser.add_argument('--clearTxCache', dest='clearTxCache', action='store_true',
                     help='clear raw transactions cache')
+    parser.add_argument('--dbQueryPlans', dest='dbQueryPlans', action='store_true',
+                    help='print the query plan of each database query to the console log')
 
     parser.set_defaults(clearAppData=False)
     parser.set_defaults(clearMnData=False)
     parser.set_defaults(clearRpcData=False)
     parser.set_defaults(clearTxCache=False)
+    parser.set_defaults(dbQueryPlans=False)
     args = parser.parse_args()
 
     if getattr( sys, 'frozen', False ) :
@@ -4,41 +4,216 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
-from blockbookClient import BlockBookClient
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import threading
+import time
+
+from blockbookClient import BlockBookClient, blockbook_servers
+from constants import API_WORKERS, API_RETRIES, API_RETRY_DELAY, API_BACKOFF_BASE, API_BACKOFF_MAX, \
+    API_EWMA_WEIGHT, API_CACHE_TTL
 from cryptoIDClient import CryptoIDClient
 
-from misc import getCallerName, getFunctionName, printException, printError
+from misc import getCallerName, getFunctionName, printException, printDbg, printOK
 
 
-def process_api_exceptions(func):
-    def process_api_exceptions_int(*args, **kwargs):
-        client = args[0]
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            message = "Primary API source not responding. Trying secondary"
-            printException(getCallerName(True), getFunctionName(True), message, str(e))
-            try:
-                client.api = CryptoIDClient(client.isTestnet)
-                return func(*args, **kwargs)
-
-            except Exception as e:
-                printError(getCallerName(True), getFunctionName(True), str(e))
+def fetch_all(fetch, keys, workers=API_WORKERS, retries=API_RETRIES, retry_delay=API_RETRY_DELAY):
+    """
+    calls fetch(key) for each key concurrently, retrying (with linear backoff) when it returns None.
+    returns a dict key -> result and the list of the keys failed
+    """
+    def fetch_with_retries(key):
+        for attempt in range(retries + 1):
+            if attempt > 0:
+                printDbg(f"Retrying {key} ({attempt}/{retries})")
+                time.sleep(retry_delay * attempt)
+            res = fetch(key)
+            if res is not None:
+                return res
+        return None
+
+    keys = list(dict.fromkeys(keys))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = dict(zip(keys, executor.map(fetch_with_retries, keys)))
+    failed = [key for key in keys if results[key] is None]
+    return {key: res for key, res in results.items() if res is not None}, failed
+
+
+class ApiCache():
+    """
+    Explorer responses keyed by (backend, method, args).
+    Entries expire after the TTL, and are all dropped at each new block
+    and after a transaction sent by us
+    """
+    def __init__(self, ttl=API_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.height = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self.misses += 1
                 return None
+            self.hits += 1
+            # callers may change the returned objects
+            return copy.deepcopy(entry[1])
 
-    return process_api_exceptions_int
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time(), copy.deepcopy(value))
 
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
 
-class ApiClient:
+    def setHeight(self, height):
+        with self.lock:
+            if height != self.height:
+                self.entries.clear()
+                self.height = height
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class ExplorerBackend():
+    """
+    Explorer API client, with its rolling success rate and latency.
+    After a failure the backend is skipped for a time growing exponentially
+    with the consecutive failures, then it gets a request again (probe).
+    The stats are updated by the fetch_all workers concurrently (guarded by lock).
+    """
+    def __init__(self, name, api):
+        self.name = name
+        self.api = api
+        self.lock = threading.Lock()
+        self.success_rate = 1.0
+        self.latency = None
+        self.failures = 0
+        self.retry_time = 0
+
+    def isAvailable(self, time_now):
+        with self.lock:
+            return self.retry_time <= time_now
+
+    def isProbing(self, time_now):
+        with self.lock:
+            return self.failures > 0 and self.retry_time <= time_now
+
+    def score(self):
+        # lower is better
+        with self.lock:
+            latency = self.latency if self.latency is not None else 1.0
+            return latency / max(self.success_rate, 0.01)
 
+    def stats(self):
+        with self.lock:
+            return {'success_rate': round(self.success_rate, 3),
+                    'latency': None if self.latency is None else round(self.latency, 3),
+                    'failures': self.failures}
+
+    def updateStats(self, ok, latency, time_now):
+        w = API_EWMA_WEIGHT
+        recovered = False
+        with self.lock:
+            if ok:
+                if self.failures > 0:
+                    recovered = True
+                    self.success_rate = 1.0
+                self.failures = 0
+                self.retry_time = 0
+                self.success_rate = w + (1 - w) * self.success_rate
+                self.latency = latency if self.latency is None else w * latency + (1 - w) * self.latency
+            else:
+                self.failures += 1
+                self.retry_time = time_now + min(API_BACKOFF_BASE * 2 ** (self.failures - 1), API_BACKOFF_MAX)
+                self.success_rate = (1 - w) * self.success_rate
+        if recovered:
+            printOK(f"Explorer backend {self.name} is back")
+
+    def call(self, method, *args):
+        start = time.time()
+        try:
+            res = getattr(self.api, method)(*args)
+        except Exception as e:
+            err_msg = f"Explorer backend {self.name} not responding"
+            printException(getCallerName(), getFunctionName(), err_msg, str(e))
+            res = None
+        time_now = time.time()
+        self.updateStats(res is not None, time_now - start, time_now)
+        return res
+
+
+class ApiClient:
+    """
+    Routes each request to the best explorer backend (BlockBook servers, then CryptoID),
+    failing over to the others
+    """
     def __init__(self, isTestnet=False):
         self.isTestnet = isTestnet
-        self.api = BlockBookClient(isTestnet)
+        self.lock = threading.Lock()
+        self.backends = [ExplorerBackend(url, BlockBookClient(isTestnet, url)) for url in blockbook_servers[isTestnet]]
+        if not isTestnet:
+            self.backends.append(ExplorerBackend("CryptoID", CryptoIDClient(isTestnet)))
+        self.selected = None
+        self.cache = ApiCache()
+
+    def getBackends(self):
+        # backends in the order they are tried: probes first, then by score.
+        # If all are backing off, the one to be retried first.
+        time_now = time.time()
+        with self.lock:
+            available = [b for b in self.backends if b.isAvailable(time_now)]
+            if len(available) == 0:
+                return [min(self.backends, key=lambda b: b.retry_time)]
+            available.sort(key=lambda b: (not b.isProbing(time_now), b.score()))
+            return available
+
+    def route(self, method, *args):
+        backends = self.getBackends()
+        for backend in backends:
+            res = self.cache.get((backend.name, method, args))
+            if res is not None:
+                return res
+        for backend in backends:
+            res = backend.call(method, *args)
+            if res is not None:
+                if backend is not self.selected:
+                    self.selected = backend
+                    printOK(f"Explorer backend: {backend.name}")
+                self.cache.put((backend.name, method, args), res)
+                return res
+        return None
+
+    def setTipHeight(self, height):
+        # new block: cached responses are outdated
+        self.cache.setHeight(height)
+
+    def invalidateCache(self):
+        self.cache.invalidate()
 
-    @process_api_exceptions
     def getAddressUtxos(self, address):
-        return self.api.getAddressUtxos(address)
+        return self.route('getAddressUtxos', address)
+
+    def getAddressesUtxos(self, addresses, workers=API_WORKERS, retries=API_RETRIES):
+        """
+        fetches the UTXOs of the addresses concurrently.
+        returns a dict address -> utxos list and the list of the addresses failed
+        """
+        return fetch_all(self.getAddressUtxos, addresses, workers, retries)
 
-    @process_api_exceptions
     def getBalance(self, address):
-        return self.api.getBalance(address)
+        return self.route('getBalance', address)
+
+    def getStats(self):
+        with self.lock:
+            return {b.name: b.stats() for b in self.backends}
+
+    def getCacheStats(self):
+        return self.cache.stats()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+import certifi
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import API_POOL_HOSTS, API_POOL_MAXSIZE
+from rateLimiter import apiRateLimiter
+
+
+class ApiSession():
+    """
+    HTTP session shared by the explorer API clients: keep-alive connections
+    (pooled for each host), gzip responses and per-host rate limiting
+    """
+    def __init__(self, pool_hosts=API_POOL_HOSTS, pool_maxsize=API_POOL_MAXSIZE):
+        self.session = requests.Session()
+        self.session.verify = certifi.where()
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def get(self, url, **kwargs):
+        apiRateLimiter.acquire(url)
+        return self.session.get(url, **kwargs)
+
+    def getStats(self):
+        # requests sent and connections opened (TCP + TLS handshakes) for each host
+        pools = self.adapter.poolmanager.pools
+        stats = {}
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(f"{pool.host}:{pool.port}", {'requests': 0, 'connections': 0})
+            host_stats['requests'] += pool.num_requests
+            host_stats['connections'] += pool.num_connections
+        return stats
+
+
+# Session shared by the explorer API clients
+apiSession = ApiSession()
@@ -4,55 +4,47 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
-import requests
-import certifi
+import copy
+import threading
 
-from misc import getCallerName, getFunctionName, printException
+from apiSession import apiSession
 
 
-def process_blockbook_exceptions(func):
-    def process_blockbook_exceptions_int(*args, **kwargs):
-        client = args[0]
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            if client.isTestnet:
-                new_url = "https://testnet.duddino.com/"
-            else:
-                new_url = "https://zkbitcoin.com/"
-            message = f"BlockBook Client exception on {client.url}\nTrying backup server {new_url}"
-            printException(getCallerName(True), getFunctionName(True), message, str(e))
-
-            try:
-                client.url = new_url
-                return func(*args, **kwargs)
-
-            except Exception:
-                raise
-
-    return process_blockbook_exceptions_int
+# BlockBook servers (first one preferred)
+blockbook_servers = {
+    False: ["https://explorer.duddino.com", "https://zkbitcoin.com"],
+    True: ["https://testnet.fuzzbawls.pw", "https://testnet.duddino.com"]
+}
 
 
 class BlockBookClient:
 
-    def __init__(self, isTestnet=False):
+    def __init__(self, isTestnet=False, url=None):
         self.isTestnet = isTestnet
-        if isTestnet:
-            self.url = "https://testnet.fuzzbawls.pw"
-        else:
-            self.url = "https://explorer.duddino.com/"
+        self.url = url if url is not None else blockbook_servers[isTestnet][0]
+        # url -> (ETag, data) of the last responses (for conditional requests)
+        self.etags = {}
+        self.lock = threading.Lock()
 
     def checkResponse(self, method, param=""):
         url = f"{self.url}/api/{method}"
         if param != "":
-            url += "/{param}"
-        resp = requests.get(url, data={}, verify=certifi.where())
+            url += f"/{param}"
+        with self.lock:
+            etag, cached = self.etags.get(url, (None, None))
+        headers = {'If-None-Match': etag} if etag is not None else {}
+        resp = apiSession.get(url, headers=headers)
+        if resp.status_code == 304 and etag is not None:
+            # not modified
+            return copy.deepcopy(cached)
         if resp.status_code == 200:
             data = resp.json()
+            if resp.headers.get('ETag') is not None:
+                with self.lock:
+                    self.etags[url] = (resp.headers['ETag'], copy.deepcopy(data))
             return data
-        raise Exception("Invalid response")
+        raise Exception(f"Invalid response ({resp.status_code})")
 
-    @process_blockbook_exceptions
     def getAddressUtxos(self, address):
         utxos = self.checkResponse("utxo", address)
         # Add script for cryptoID legacy
@@ -60,6 +52,5 @@ class BlockBookClient:
             u["script"] = ""
         return utxos
 
-    @process_blockbook_exceptions
     def getBalance(self, address):
         return self.checkResponse("address", address)["balance"]
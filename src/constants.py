@@ -27,6 +27,37 @@ home_dir = os.path.expanduser('~')
 user_dir = os.path.join(home_dir, APPDATA_DIRNAME)
 log_File = os.path.join(user_dir, 'debug.log')
 database_File = os.path.join(user_dir, 'application.db')
+DB_JOURNAL_MODE = "WAL"
+DB_SYNCHRONOUS = "NORMAL"  # safe with WAL: only the last commits may be lost on power failure
+DB_CACHE_SIZE = -16000  # page cache for each connection (negative: KiB)
+DB_BUSY_TIMEOUT = 30  # seconds a connection waits for a lock held by another thread
+DB_COMPRESS_RAWTXES = True  # zlib-compress cached raw txes (kept only when smaller)
+DB_RAWTXES_MAX_BYTES = 32 * 1024 * 1024  # size budget of the raw txes cache
+DB_PRUNE_BATCH = 200  # raw txes removed in each (short) transaction when pruning the cache
+DB_MN_LIST_SNAPSHOTS = 500  # network masternode list snapshots kept (older deltas are compacted)
+RPC_BATCH_SIZE = 100  # calls sent in each JSON-RPC batch request
+RPC_CACHE_TIP_MAX_AGE = 15  # seconds before checking the chain tip again, for the cached RPC results
+RPC_POOL_PROBE_TIMEOUT = 10  # seconds to wait for the status of the pool servers
+RPC_POOL_MAX_LAG = 2  # blocks a pool server can be behind the best one, to be considered healthy
+RPC_POOL_MAX_TRIES = 2  # servers tried for a read-only call, before giving up
+RPC_POOL_EWMA_WEIGHT = 0.3  # weight of the last sample in latency / error rate averages
+TXCACHE_MEM_SIZE = 4096  # raw txes kept in memory (LRU in front of the database), about the reward utxos of a wallet
+MN_STATUS_WORKERS = 8  # masternode statuses (balance requests) refreshed concurrently
+API_HOST_RATE = 5  # requests per second sent to each explorer API host
+API_HOST_BURST = 5  # requests sent at once to an explorer API host, before rate limiting
+API_POOL_HOSTS = 4  # explorer API hosts with a pool of keep-alive connections
+API_POOL_MAXSIZE = 8  # keep-alive connections kept for each explorer API host
+API_WORKERS = 8  # addresses queried concurrently to the explorer API
+API_RETRIES = 2  # retries of a failed explorer request (for each address)
+API_RETRY_DELAY = 1  # seconds before the first retry (increased linearly)
+API_BACKOFF_BASE = 30  # seconds a failed explorer backend is skipped (doubled at each consecutive failure)
+API_BACKOFF_MAX = 30 * 60  # maximum seconds a failed explorer backend is skipped
+API_EWMA_WEIGHT = 0.3  # weight of the last request in the explorer backends success rate / latency
+API_CACHE_TTL = 60  # seconds explorer responses are cached (if no new block in the meantime)
+CRYPTOID_KEY_RATE = 1  # requests per second sent with each CryptoID API key
+CRYPTOID_KEY_BURST = 2  # requests sent at once with a CryptoID API key, before rate limiting
+CRYPTOID_RETRY_AFTER = 10  # seconds a throttled CryptoID API key is paused (if not set by the server)
+CRYPTOID_MAX_TRIES = 5  # attempts of a throttled CryptoID request
 NEW_SIGS_HEIGHT_MAINNET = 2153200
 NEW_SIGS_HEIGHT_TESTNET = 1347000
 SECONDS_IN_2_MONTHS = 60 * 24 * 60 * 60
@@ -4,14 +4,16 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
-from random import choice
-import requests
-import certifi
-
-from misc import getCallerName, getFunctionName, printException
+from apiSession import apiSession
+from constants import CRYPTOID_KEY_RATE, CRYPTOID_KEY_BURST, CRYPTOID_RETRY_AFTER, CRYPTOID_MAX_TRIES
+from misc import getCallerName, getFunctionName, printException, printDbg
+from rateLimiter import KeyScheduler
 
 api_keys = ["b62b40b5091e", "f1d66708a077", "ed85c85c0126", "ccc60d06f737"]
 
+# Requests spread across the API keys (each one with its own rate limit)
+keyScheduler = KeyScheduler(api_keys, CRYPTOID_KEY_RATE, CRYPTOID_KEY_BURST)
+
 
 def process_cryptoID_exceptions(func):
     def process_cryptoID_exceptions_int(*args, **kwargs):
@@ -25,6 +27,14 @@ def process_cryptoID_exceptions(func):
     return process_cryptoID_exceptions_int
 
 
+def retry_after_seconds(resp):
+    # seconds from the Retry-After header of a throttled response (default if missing or a date)
+    try:
+        return max(0, int(resp.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return CRYPTOID_RETRY_AFTER
+
+
 def UTXOS_cryptoID_to_trezor(utxos):
     # convert JSON labels
     new_utxos = []
@@ -47,23 +57,30 @@ class CryptoIDClient:
             raise Exception("\nNo CryptoID Testnet server\n")
         self.isTestnet = False
         self.url = "http://chainz.cryptoid.info/pivx/api.dws"
-        self.parameters = {}
 
     def checkResponse(self, parameters):
-        key = choice(api_keys)
-        parameters['key'] = key
-        resp = requests.get(self.url, params=parameters, verify=certifi.where())
-        if resp.status_code == 200:
-            data = resp.json()
-            return data
-        return None
+        for _ in range(CRYPTOID_MAX_TRIES):
+            # wait for a key with available rate
+            parameters['key'] = keyScheduler.acquire()
+            resp = apiSession.get(self.url, params=parameters)
+            if resp.status_code == 200:
+                data = resp.json()
+                return data
+            if resp.status_code not in [429, 503]:
+                break
+            # throttled: pause the key and queue the request again
+            retry_after = retry_after_seconds(resp)
+            printDbg(f"CryptoID: key {parameters['key']} throttled (retry after {retry_after} sec)")
+            keyScheduler.block(parameters['key'], retry_after)
+
+        raise Exception(f"Invalid response ({resp.status_code})")
 
     @process_cryptoID_exceptions
     def getAddressUtxos(self, address):
-        self.parameters = {}
-        self.parameters['q'] = 'unspent'
-        self.parameters['active'] = address
-        res = self.checkResponse(self.parameters)
+        parameters = {}
+        parameters['q'] = 'unspent'
+        parameters['active'] = address
+        res = self.checkResponse(parameters)
         if res is None:
             return None
         else:
@@ -71,7 +88,7 @@ class CryptoIDClient:
 
     @process_cryptoID_exceptions
     def getBalance(self, address):
-        self.parameters = {}
-        self.parameters['q'] = 'getbalance'
-        self.parameters['a'] = address
-        return self.checkResponse(self.parameters)
+        parameters = {}
+        parameters['q'] = 'getbalance'
+        parameters['a'] = address
+        return self.checkResponse(parameters)
@@ -4,27 +4,193 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
+import json
 import logging
 import sqlite3
 import threading
+import weakref
+import zlib
 
-from constants import database_File, trusted_RPC_Servers, DEFAULT_MN_CONF
+from constants import database_File, trusted_RPC_Servers, DEFAULT_MN_CONF, \
+    DB_JOURNAL_MODE, DB_SYNCHRONOUS, DB_CACHE_SIZE, DB_BUSY_TIMEOUT, DB_COMPRESS_RAWTXES, \
+    DB_RAWTXES_MAX_BYTES, DB_PRUNE_BATCH, DB_MN_LIST_SNAPSHOTS
 from proposals import Proposal, vote_type, vote_index
 from misc import printDbg, getCallerName, getFunctionName, printException, add_defaultKeys_to_dict
 
 
+def rawtx_to_row(tx_hash, rawtx, lastfetch):
+    """
+    returns the RAWTXES row for the raw tx bytes (zlib-compressed, if that makes it smaller)
+    """
+    if DB_COMPRESS_RAWTXES:
+        compressed = zlib.compress(rawtx)
+        if len(compressed) < len(rawtx):
+            return tx_hash, compressed, lastfetch, 1
+    return tx_hash, bytes(rawtx), lastfetch, 0
+
+
+def blob_to_rawtx(blob, compressed):
+    if compressed:
+        return zlib.decompress(blob)
+    return blob
+
+
+def migrate_rawtxes_to_blob(cursor):
+    # convert the hex TEXT column of RAWTXES to (compressed) BLOB
+    cursor.execute("ALTER TABLE RAWTXES RENAME TO RAWTXES_OLD")
+    cursor.execute("CREATE TABLE RAWTXES("
+                   " tx_hash TEXT PRIMARY KEY, rawtx BLOB, lastfetch INTEGER, compressed INTEGER)")
+    old_rows = cursor.connection.execute("SELECT tx_hash, rawtx, lastfetch FROM RAWTXES_OLD")
+    cursor.executemany("INSERT INTO RAWTXES VALUES (?, ?, ?, ?)",
+                       (rawtx_to_row(tx_hash, bytes.fromhex(rawtx), lastfetch)
+                        for tx_hash, rawtx, lastfetch in old_rows))
+    cursor.execute("DROP TABLE RAWTXES_OLD")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rawtxes_lastfetch ON RAWTXES(lastfetch)")
+
+
+# Schema migrations: the n-th item upgrades the schema from version n to version n + 1
+# (version stored in PRAGMA user_version). Either a list of statements or a function of the cursor.
+SCHEMA_MIGRATIONS = [
+    # v1: secondary indexes
+    ["CREATE INDEX IF NOT EXISTS idx_rewards_mn_name ON REWARDS(mn_name)",
+     "CREATE INDEX IF NOT EXISTS idx_rawtxes_lastfetch ON RAWTXES(lastfetch)",
+     "CREATE INDEX IF NOT EXISTS idx_my_votes_p_hash ON MY_VOTES(p_hash)"],
+    # v2: raw txes stored as BLOB
+    migrate_rawtxes_to_blob,
+    # v3: network masternode list snapshots
+    ["CREATE TABLE IF NOT EXISTS MN_LIST_SNAPSHOTS("
+     " height INTEGER PRIMARY KEY, time INTEGER, changes INTEGER)",
+     "CREATE TABLE IF NOT EXISTS MN_LIST_DELTAS("
+     " tx_hash TEXT, tx_ouput_n INTEGER, height INTEGER, status TEXT, data TEXT,"
+     " PRIMARY KEY (tx_hash, tx_ouput_n, height))",
+     "CREATE INDEX IF NOT EXISTS idx_mn_list_deltas_height ON MN_LIST_DELTAS(height)"],
+    # v4: parsed outputs metadata
+    ["CREATE TABLE IF NOT EXISTS TX_OUTPUT_META("
+     " tx_hash TEXT, tx_ouput_n INTEGER, script_type TEXT, staker TEXT, coinstake BOOLEAN, satoshis INTEGER,"
+     " PRIMARY KEY (tx_hash, tx_ouput_n))"],
+]
+
+# Fields of the listmasternodes entries changing at every refresh (not stored in the snapshots)
+MN_LIST_VOLATILE_KEYS = ['rank', 'activetime', 'lastseen', 'lastpaid', 'score', 'queue_pos', 'balance',
+                         'status_change']
+
+
+def mn_to_data(mn):
+    """
+    returns the (JSON) data of a network list entry, stored in MN_LIST_DELTAS
+    """
+    return json.dumps({k: v for k, v in mn.items() if k not in MN_LIST_VOLATILE_KEYS}, sort_keys=True)
+
+
+# SQL statements run by the Database methods ("{}" replaced by the table name or by the list of IN parameters)
+SQL_INSERT_RPC_SERVER = "INSERT INTO CUSTOM_RPC_SERVERS (protocol, host, user, pass) VALUES (?, ?, ?, ?)"
+SQL_UPDATE_RPC_SERVER = "UPDATE CUSTOM_RPC_SERVERS SET protocol = ?, host = ?, user = ?, pass = ? WHERE id = ?"
+SQL_SELECT_RPC_SERVERS = "SELECT * FROM {}"
+SQL_SELECT_RPC_SERVER = "SELECT * FROM {} WHERE id = ?"
+SQL_DELETE_RPC_SERVER = "DELETE FROM CUSTOM_RPC_SERVERS WHERE id = ?"
+
+SQL_SELECT_MASTERNODES = "SELECT * FROM MASTERNODES"
+SQL_INSERT_MASTERNODE = ("INSERT INTO MASTERNODES(name, ip, port, mnPrivKey, hwAcc, isTestnet, isHardware,"
+                         " address, spath, pubkey, txid, txidn) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_UPDATE_MASTERNODE = ("UPDATE MASTERNODES SET name = ?, ip = ?, port = ?, mnPrivKey = ?, hwAcc = ?, isTestnet = ?,"
+                         " isHardware = ?, address = ?, spath = ?, pubkey = ?, txid = ?, txidn = ? WHERE name = ?")
+SQL_DELETE_MASTERNODE = "DELETE FROM MASTERNODES WHERE name = ?"
+
+SQL_INSERT_REWARD = "INSERT OR REPLACE INTO REWARDS VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_UPDATE_REWARD = "UPDATE REWARDS SET confirmations = ?, mn_name = ? WHERE tx_hash = ? AND tx_ouput_n = ?"
+SQL_DELETE_REWARD = "DELETE FROM REWARDS WHERE tx_hash = ? AND tx_ouput_n = ?"
+SQL_SELECT_REWARD = "SELECT * FROM REWARDS WHERE tx_hash = ? AND tx_ouput_n = ?"
+SQL_SELECT_REWARDS = "SELECT * FROM REWARDS"
+SQL_SELECT_MN_REWARDS = "SELECT * FROM REWARDS WHERE mn_name = ?"
+
+SQL_INSERT_RAWTX = "INSERT OR REPLACE INTO RAWTXES VALUES (?, ?, ?, ?)"
+SQL_DELETE_RAWTX = "DELETE FROM RAWTXES WHERE tx_hash = ?"
+SQL_SELECT_RAWTX = "SELECT * FROM RAWTXES WHERE tx_hash = ?"
+SQL_SELECT_RAWTXES = "SELECT * FROM RAWTXES WHERE tx_hash IN ({})"
+SQL_UPDATE_RAWTX_LASTFETCH = "UPDATE RAWTXES SET lastfetch = ? WHERE tx_hash = ?"
+SQL_DELETE_OLD_RAWTXES = "DELETE FROM RAWTXES WHERE lastfetch < ?"
+SQL_DELETE_UNREFERENCED_RAWTXES = ("DELETE FROM RAWTXES WHERE tx_hash IN (SELECT tx_hash FROM RAWTXES"
+                                   " WHERE tx_hash NOT IN (SELECT tx_hash FROM REWARDS) LIMIT ?)")
+SQL_SELECT_RAWTXES_SIZE = "SELECT COALESCE(SUM(length(rawtx)), 0) FROM RAWTXES"
+SQL_SELECT_LRU_RAWTXES = "SELECT tx_hash, length(rawtx) FROM RAWTXES ORDER BY lastfetch LIMIT ?"
+
+SQL_INSERT_OUTPUT_META = "INSERT OR REPLACE INTO TX_OUTPUT_META VALUES (?, ?, ?, ?, ?, ?)"
+SQL_SELECT_OUTPUTS_META = "SELECT * FROM TX_OUTPUT_META WHERE tx_hash IN ({})"
+SQL_DELETE_UNREFERENCED_OUTPUTS_META = ("DELETE FROM TX_OUTPUT_META WHERE NOT EXISTS (SELECT 1 FROM REWARDS AS r"
+                                        " WHERE r.tx_hash = TX_OUTPUT_META.tx_hash"
+                                        " AND r.tx_ouput_n = TX_OUTPUT_META.tx_ouput_n)")
+
+SQL_SELECT_LAST_MN_SNAPSHOT = "SELECT MAX(height) FROM MN_LIST_SNAPSHOTS"
+SQL_SELECT_MN_LIST = ("SELECT tx_hash, tx_ouput_n, data, MAX(height) FROM MN_LIST_DELTAS"
+                      " WHERE height <= ? GROUP BY tx_hash, tx_ouput_n")
+SQL_INSERT_MN_DELTA = "INSERT OR REPLACE INTO MN_LIST_DELTAS VALUES (?, ?, ?, ?, ?)"
+# snapshot saved again at the same height: first time kept, changes counted over the merged deltas
+SQL_INSERT_MN_SNAPSHOT = ("INSERT OR REPLACE INTO MN_LIST_SNAPSHOTS VALUES (?,"
+                          " COALESCE((SELECT time FROM MN_LIST_SNAPSHOTS WHERE height = ?), ?),"
+                          " (SELECT COUNT(*) FROM MN_LIST_DELTAS WHERE height = ?))")
+SQL_SELECT_MN_SNAPSHOTS_CUTOFF = "SELECT height FROM MN_LIST_SNAPSHOTS ORDER BY height DESC LIMIT 1 OFFSET ?"
+SQL_COMPACT_MN_DELTAS = ("DELETE FROM MN_LIST_DELTAS WHERE height < ? AND (data IS NULL OR height <"
+                         " (SELECT MAX(d.height) FROM MN_LIST_DELTAS AS d WHERE d.tx_hash = MN_LIST_DELTAS.tx_hash"
+                         " AND d.tx_ouput_n = MN_LIST_DELTAS.tx_ouput_n AND d.height < ?))")
+SQL_DELETE_OLD_MN_SNAPSHOTS = ("DELETE FROM MN_LIST_SNAPSHOTS WHERE height < ?"
+                               " AND height NOT IN (SELECT height FROM MN_LIST_DELTAS)")
+SQL_SELECT_MN_STATUS_CHANGES = ("SELECT d.height, d.status, s.time FROM MN_LIST_DELTAS AS d"
+                                " LEFT JOIN MN_LIST_SNAPSHOTS AS s ON s.height = d.height"
+                                " WHERE d.tx_hash = ? AND d.tx_ouput_n = ? ORDER BY d.height DESC")
+
+SQL_INSERT_MY_VOTE = "INSERT OR REPLACE INTO MY_VOTES VALUES (?, ?, ?, ?)"
+SQL_SELECT_MY_VOTES = "SELECT * FROM MY_VOTES"
+SQL_SELECT_PROPOSAL_VOTES = "SELECT * FROM MY_VOTES WHERE p_hash = ?"
+SQL_INSERT_PROPOSAL = "INSERT OR REPLACE INTO PROPOSALS VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_SELECT_PROPOSALS = "SELECT * FROM PROPOSALS"
+
+
+def in_params(num_of_params):
+    # placeholders of an IN list
+    return ', '.join('?' * num_of_params)
+
+
+# Queries checked by printQueryPlans (with placeholder parameters)
+DB_QUERIES = [(query, (0,) * query.count('?')) for query in [
+    SQL_INSERT_RPC_SERVER, SQL_UPDATE_RPC_SERVER, SQL_SELECT_RPC_SERVER.format("CUSTOM_RPC_SERVERS"),
+    SQL_DELETE_RPC_SERVER,
+    SQL_SELECT_MASTERNODES, SQL_INSERT_MASTERNODE, SQL_UPDATE_MASTERNODE, SQL_DELETE_MASTERNODE,
+    SQL_INSERT_REWARD, SQL_UPDATE_REWARD, SQL_DELETE_REWARD, SQL_SELECT_REWARD, SQL_SELECT_REWARDS,
+    SQL_SELECT_MN_REWARDS,
+    SQL_INSERT_RAWTX, SQL_DELETE_RAWTX, SQL_SELECT_RAWTX, SQL_SELECT_RAWTXES.format(in_params(2)),
+    SQL_UPDATE_RAWTX_LASTFETCH, SQL_DELETE_OLD_RAWTXES, SQL_DELETE_UNREFERENCED_RAWTXES, SQL_SELECT_RAWTXES_SIZE,
+    SQL_SELECT_LRU_RAWTXES,
+    SQL_INSERT_OUTPUT_META, SQL_SELECT_OUTPUTS_META.format(in_params(2)), SQL_DELETE_UNREFERENCED_OUTPUTS_META,
+    SQL_SELECT_LAST_MN_SNAPSHOT, SQL_SELECT_MN_LIST, SQL_INSERT_MN_DELTA, SQL_INSERT_MN_SNAPSHOT,
+    SQL_SELECT_MN_SNAPSHOTS_CUTOFF, SQL_COMPACT_MN_DELTAS, SQL_DELETE_OLD_MN_SNAPSHOTS, SQL_SELECT_MN_STATUS_CHANGES,
+    SQL_INSERT_MY_VOTE, SQL_SELECT_MY_VOTES, SQL_SELECT_PROPOSAL_VOTES, SQL_INSERT_PROPOSAL, SQL_SELECT_PROPOSALS,
+]]
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection owned by a single thread.
+    Subclassed only so that the pool can keep weak references to it:
+    the connection is closed when it is garbage collected after its owner thread terminates.
+    """
+    pass
+
+
 class Database():
 
     '''
     class methods
     '''
-    def __init__(self, app):
+    def __init__(self, app, file_name=database_File):
         printDbg("DB: Initializing...")
         self.app = app
-        self.file_name = database_File
+        self.file_name = file_name
         self.lock = threading.Lock()
         self.isOpen = False
-        self.conn = None
+        # One long-lived connection per thread
+        self.local = threading.local()
+        self.connections = weakref.WeakSet()
+        self.generation = 0
         printDbg("DB: Initialized")
 
     def openDB(self):
@@ -34,13 +200,9 @@ class Database():
 
         with self.lock:
             try:
-                if self.conn is None:
-                    self.conn = sqlite3.connect(self.file_name)
-
+                self.generation += 1
                 self.initTables()
-                self.conn.commit()
-                self.conn.close()
-                self.conn = None
+                self.getConnection().commit()
                 self.isOpen = True
                 printDbg("DB: Database open")
 
@@ -57,10 +219,10 @@ class Database():
 
         with self.lock:
             try:
-                if self.conn is not None:
-                    self.conn.close()
+                for conn in list(self.connections):
+                    conn.close()
 
-                self.conn = None
+                self.connections.clear()
                 self.isOpen = False
                 printDbg("DB: Database closed")
 
@@ -68,18 +230,28 @@ class Database():
                 err_msg = 'SQLite closing error'
                 printException(getCallerName(), getFunctionName(), err_msg, e.args)
 
+    def getConnection(self):
+        # return the connection of the current thread (open a new one if needed)
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.generation != self.generation:
+            conn = sqlite3.connect(self.file_name, timeout=DB_BUSY_TIMEOUT,
+                                   check_same_thread=False, factory=PooledConnection)
+            conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+            conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+            conn.execute(f"PRAGMA cache_size = {DB_CACHE_SIZE}")
+            self.local.conn = conn
+            self.local.generation = self.generation
+            self.connections.add(conn)
+        return conn
+
     def getCursor(self):
         if self.isOpen:
-            self.lock.acquire()
             try:
-                if self.conn is None:
-                    self.conn = sqlite3.connect(self.file_name)
-                return self.conn.cursor()
+                return self.getConnection().cursor()
 
             except Exception as e:
                 err_msg = 'SQLite error getting cursor'
                 printException(getCallerName(), getFunctionName(), err_msg, e.args)
-                self.lock.release()
 
         else:
             raise Exception("Database closed")
@@ -87,35 +259,28 @@ class Database():
     def releaseCursor(self, rollingBack=False, vacuum=False):
         if self.isOpen:
             try:
-                if self.conn is not None:
+                conn = getattr(self.local, 'conn', None)
+                if conn is not None:
                     # commit
                     if rollingBack:
-                        self.conn.rollback()
+                        conn.rollback()
 
                     else:
-                        self.conn.commit()
+                        conn.commit()
                         if vacuum:
-                            self.conn.execute('vacuum')
-
-                    # close connection
-                    self.conn.close()
-
-                self.conn = None
+                            conn.execute('vacuum')
 
             except Exception as e:
                 err_msg = 'SQLite error releasing cursor'
                 printException(getCallerName(), getFunctionName(), err_msg, e.args)
 
-            finally:
-                self.lock.release()
-
         else:
             raise Exception("Database closed")
 
     def initTables(self):
         printDbg(f"DB: Initializing tables...")
         try:
-            cursor = self.conn.cursor()
+            cursor = self.getConnection().cursor()
 
             # Tables for RPC Servers
             cursor.execute("CREATE TABLE IF NOT EXISTS PUBLIC_RPC_SERVERS("
@@ -142,7 +307,7 @@ class Database():
                            " PRIMARY KEY (tx_hash, tx_ouput_n))")
 
             cursor.execute("CREATE TABLE IF NOT EXISTS RAWTXES("
-                           " tx_hash TEXT PRIMARY KEY,  rawtx TEXT, lastfetch INTEGER)")
+                           " tx_hash TEXT PRIMARY KEY, rawtx BLOB, lastfetch INTEGER, compressed INTEGER)")
 
             # Tables for Governance Objects
             cursor.execute("CREATE TABLE IF NOT EXISTS PROPOSALS("
@@ -160,12 +325,36 @@ class Database():
                            " mn_name TEXT, p_hash, vote INTEGER, timeslip INTEGER, "
                            " PRIMARY KEY (mn_name, p_hash))")
 
+            self.migrateSchema(cursor)
+
             printDbg("DB: Tables initialized")
 
         except Exception as e:
             err_msg = 'error initializing tables'
             printException(getCallerName(), getFunctionName(), err_msg, e.args)
 
+    def migrateSchema(self, cursor):
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        while version < len(SCHEMA_MIGRATIONS):
+            printDbg(f"DB: Migrating schema to version {version + 1}...")
+            # each migration is applied atomically
+            cursor.connection.commit()
+            cursor.execute("BEGIN")
+            try:
+                migration = SCHEMA_MIGRATIONS[version]
+                if callable(migration):
+                    migration(cursor)
+                else:
+                    for statement in migration:
+                        cursor.execute(statement)
+                version += 1
+                cursor.execute(f"PRAGMA user_version = {version}")
+            except Exception:
+                cursor.connection.rollback()
+                raise
+            cursor.connection.commit()
+
     def initTable_RPC(self, cursor):
         s = trusted_RPC_Servers
         # Insert Default public trusted servers
@@ -221,6 +410,27 @@ class Database():
         finally:
             self.releaseCursor(vacuum=True)
 
+    def printQueryPlans(self):
+        """
+        prints (and returns) the output of EXPLAIN QUERY PLAN for each query in DB_QUERIES
+        """
+        printDbg("DB: Query plans")
+        plans = {}
+        try:
+            cursor = self.getCursor()
+            for query, params in DB_QUERIES:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+                plans[query] = [row[-1] for row in cursor.fetchall()]
+                printDbg(f"{query}<br>  --> {' | '.join(plans[query])}")
+
+        except Exception as e:
+            err_msg = 'error getting query plans'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+        finally:
+            self.releaseCursor()
+
+        return plans
+
     '''
     RPC servers methods
     '''
@@ -231,10 +441,7 @@ class Database():
         try:
             cursor = self.getCursor()
 
-            cursor.execute("INSERT INTO CUSTOM_RPC_SERVERS (protocol, host, user, pass) "
-                           "VALUES (?, ?, ?, ?)",
-                           (protocol, host, user, passwd)
-                           )
+            cursor.execute(SQL_INSERT_RPC_SERVER, (protocol, host, user, passwd))
             added_RPC = True
             printDbg("DB: RPC server added")
 
@@ -252,11 +459,7 @@ class Database():
         try:
             cursor = self.getCursor()
 
-            cursor.execute("UPDATE CUSTOM_RPC_SERVERS "
-                           "SET protocol = ?, host = ?, user = ?, pass = ?"
-                           "WHERE id = ?",
-                           (protocol, host, user, passwd, id)
-                           )
+            cursor.execute(SQL_UPDATE_RPC_SERVER, (protocol, host, user, passwd, id))
             changed_RPC = True
 
         except Exception as e:
@@ -276,9 +479,9 @@ class Database():
         try:
             cursor = self.getCursor()
             if id is None:
-                cursor.execute(f"SELECT * FROM {tableName}")
+                cursor.execute(SQL_SELECT_RPC_SERVERS.format(tableName))
             else:
-                cursor.execute(f"SELECT * FROM {tableName} WHERE id = ?", (id,))
+                cursor.execute(SQL_SELECT_RPC_SERVER.format(tableName), (id,))
             rows = cursor.fetchall()
 
         except Exception as e:
@@ -309,8 +512,7 @@ class Database():
         removed_RPC = False
         try:
             cursor = self.getCursor()
-            cursor.execute("DELETE FROM CUSTOM_RPC_SERVERS"
-                           " WHERE id=?", (id,))
+            cursor.execute(SQL_DELETE_RPC_SERVER, (id,))
             removed_RPC = True
 
         except Exception as e:
@@ -331,7 +533,7 @@ class Database():
         try:
             cursor = self.getCursor()
 
-            cursor.execute("SELECT * FROM MASTERNODES")
+            cursor.execute(SQL_SELECT_MASTERNODES)
             rows = cursor.fetchall()
 
         except Exception as e:
@@ -370,9 +572,7 @@ class Database():
         try:
             cursor = self.getCursor()
 
-            cursor.execute("INSERT INTO MASTERNODES(name, ip, port, mnPrivKey,"
-                           " hwAcc, isTestnet, isHardware,  address, spath, pubkey, txid, txidn) "
-                           "VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+            cursor.execute(SQL_INSERT_MASTERNODE,
                            (mn['name'], mn['ip'], mn['port'], mn['mnPrivKey'], mn['hwAcc'], mn['isTestnet'],
                             1 if mn['isHardware'] else 0,
                             mn['collateral'].get('address'), mn['collateral'].get('spath'),
@@ -393,10 +593,7 @@ class Database():
             try:
                 cursor = self.getCursor()
 
-                cursor.execute("UPDATE MASTERNODES "
-                               "SET name = ?, ip = ?, port = ?, mnPrivKey = ?, hwAcc = ?, isTestnet = ?, isHardware = ?,"
-                               "    address = ?, spath = ?, pubkey = ?, txid = ?, txidn = ?"
-                               "WHERE name = ?",
+                cursor.execute(SQL_UPDATE_MASTERNODE,
                                (mn['name'], mn['ip'], mn['port'], mn['mnPrivKey'], mn['hwAcc'], mn['isTestnet'],
                                 1 if mn['isHardware'] else 0,
                                 mn['collateral'].get('address'), mn['collateral'].get('spath'),
@@ -418,7 +615,7 @@ class Database():
         printDbg(f"DB: Deleting masternode {mn_name}")
         try:
             cursor = self.getCursor()
-            cursor.execute("DELETE FROM MASTERNODES WHERE name = ? ", (mn_name,))
+            cursor.execute(SQL_DELETE_MASTERNODE, (mn_name,))
 
         except Exception as e:
             err_msg = 'error deleting masternode from DB'
@@ -449,16 +646,16 @@ class Database():
 
         return rewards
 
+    def reward_to_row(self, utxo):
+        return (utxo['txid'], utxo['vout'], utxo['satoshis'], utxo['confirmations'],
+                utxo['script'], utxo['mn_name'], utxo['coinstake'], utxo['staker'])
+
     def addReward(self, utxo):
         logging.debug("DB: Adding reward")
         try:
             cursor = self.getCursor()
 
-            cursor.execute("INSERT OR REPLACE INTO REWARDS "
-                           "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                           (utxo['txid'], utxo['vout'], utxo['satoshis'],
-                            utxo['confirmations'], utxo['script'], utxo['mn_name'], utxo['coinstake'], utxo['staker'])
-                           )
+            cursor.execute(SQL_INSERT_REWARD, self.reward_to_row(utxo))
 
         except Exception as e:
             err_msg = 'error adding reward UTXO to DB'
@@ -467,11 +664,53 @@ class Database():
         finally:
             self.releaseCursor()
 
+    def addRewards(self, utxos):
+        """
+        adds a batch of reward UTXOs in a single transaction
+        """
+        logging.debug(f"DB: Adding {len(utxos)} rewards")
+        try:
+            cursor = self.getCursor()
+
+            cursor.executemany(SQL_INSERT_REWARD, [self.reward_to_row(utxo) for utxo in utxos])
+
+        except Exception as e:
+            err_msg = 'error adding reward UTXOs to DB'
+            printException(getCallerName(), getFunctionName(), err_msg, e)
+            self.releaseCursor(rollingBack=True)
+
+        else:
+            self.releaseCursor()
+
+    def syncRewards(self, added, removed, updated):
+        """
+        applies a UTXO set difference in a single transaction:
+        inserts the added UTXOs, deletes the removed outpoints (list of (tx_hash, tx_ouput_n))
+        and updates confirmations and mn_name of the others
+        """
+        logging.debug(f"DB: Syncing rewards (+{len(added)} -{len(removed)} ~{len(updated)})")
+        try:
+            cursor = self.getCursor()
+
+            cursor.executemany(SQL_DELETE_REWARD, removed)
+            cursor.executemany(SQL_UPDATE_REWARD,
+                               [(utxo['confirmations'], utxo['mn_name'], utxo['txid'], utxo['vout'])
+                                for utxo in updated])
+            cursor.executemany(SQL_INSERT_REWARD, [self.reward_to_row(utxo) for utxo in added])
+
+        except Exception as e:
+            err_msg = 'error syncing reward UTXOs in DB'
+            printException(getCallerName(), getFunctionName(), err_msg, e)
+            self.releaseCursor(rollingBack=True)
+
+        else:
+            self.releaseCursor()
+
     def deleteReward(self, tx_hash, tx_ouput_n):
         logging.debug("DB: Deleting reward")
         try:
             cursor = self.getCursor()
-            cursor.execute("DELETE FROM REWARDS WHERE tx_hash = ? AND tx_ouput_n = ?", (tx_hash, tx_ouput_n))
+            cursor.execute(SQL_DELETE_REWARD, (tx_hash, tx_ouput_n))
 
         except Exception as e:
             err_msg = 'error deleting UTXO from DB'
@@ -484,8 +723,7 @@ class Database():
         try:
             cursor = self.getCursor()
 
-            cursor.execute("SELECT * FROM REWARDS"
-                           " WHERE tx_hash = ? AND tx_ouput_n = ?", (tx_hash, tx_output_n))
+            cursor.execute(SQL_SELECT_REWARD, (tx_hash, tx_output_n))
             rows = cursor.fetchall()
 
         except Exception as e:
@@ -506,10 +744,10 @@ class Database():
 
             if mn_name is None:
                 printDbg("DB: Getting rewards of all masternodes")
-                cursor.execute("SELECT * FROM REWARDS")
+                cursor.execute(SQL_SELECT_REWARDS)
             else:
                 printDbg(f"DB: Getting rewards of masternode {mn_name}")
-                cursor.execute("SELECT * FROM REWARDS WHERE mn_name = ?", (mn_name,))
+                cursor.execute(SQL_SELECT_MN_REWARDS, (mn_name,))
             rows = cursor.fetchall()
 
         except Exception as e:
@@ -532,7 +770,7 @@ class Database():
             # fetch tx item
             tx = {}
             tx['txid'] = row[0]
-            tx['rawtx'] = row[1]
+            tx['rawtx'] = blob_to_rawtx(row[1], row[3])
             # add to list
             txes.append(tx)
 
@@ -543,10 +781,7 @@ class Database():
         try:
             cursor = self.getCursor()
 
-            cursor.execute("INSERT OR REPLACE INTO RAWTXES "
-                           "VALUES (?, ?, ?)",
-                           (tx_hash, rawtx, lastfetch)
-                           )
+            cursor.execute(SQL_INSERT_RAWTX, rawtx_to_row(tx_hash, rawtx, lastfetch))
 
         except Exception as e:
             err_msg = f'error adding rawtx to DB'
@@ -555,11 +790,30 @@ class Database():
         finally:
             self.releaseCursor()
 
+    def addRawTxes(self, rawtxes, lastfetch=0):
+        """
+        adds a batch of raw txes (dictionary tx_hash -> rawtx bytes) in a single transaction
+        """
+        logging.debug(f"DB: Adding {len(rawtxes)} rawtxes")
+        try:
+            cursor = self.getCursor()
+
+            cursor.executemany(SQL_INSERT_RAWTX,
+                               [rawtx_to_row(tx_hash, rawtxes[tx_hash], lastfetch) for tx_hash in rawtxes])
+
+        except Exception as e:
+            err_msg = 'error adding rawtxes to DB'
+            printException(getCallerName(), getFunctionName(), err_msg, e)
+            self.releaseCursor(rollingBack=True)
+
+        else:
+            self.releaseCursor()
+
     def deleteRawTx(self, tx_hash):
         logging.debug(f"DB: Deleting rawtx for {tx_hash}")
         try:
             cursor = self.getCursor()
-            cursor.execute("DELETE FROM RAWTXES WHERE tx_hash = ?", (tx_hash,))
+            cursor.execute(SQL_DELETE_RAWTX, (tx_hash,))
 
         except Exception as e:
             err_msg = 'error deleting rawtx from DB'
@@ -567,14 +821,18 @@ class Database():
         finally:
             self.releaseCursor(vacuum=True)
 
-    def getRawTx(self, tx_hash):
+    def getRawTx(self, tx_hash, lastfetch=None):
+        """
+        if lastfetch is given, it is stored for the tx (LRU order for evictRawTxes)
+        """
         logging.debug(f"DB: Getting rawtx for {tx_hash}")
         try:
             cursor = self.getCursor()
 
-            cursor.execute("SELECT * FROM RAWTXES"
-                           " WHERE tx_hash = ?", (tx_hash,))
+            cursor.execute(SQL_SELECT_RAWTX, (tx_hash,))
             rows = cursor.fetchall()
+            if len(rows) > 0 and lastfetch is not None:
+                cursor.execute(SQL_UPDATE_RAWTX_LASTFETCH, (lastfetch, tx_hash))
 
         except Exception as e:
             err_msg = f'error getting raw tx for {tx_hash}'
@@ -587,6 +845,33 @@ class Database():
             return self.txes_from_rows(rows)[0]
         return None
 
+    def getRawTxes(self, tx_hashes, lastfetch=None, chunk_size=500):
+        """
+        returns the dictionary tx_hash -> rawtx of the given txes found in the database.
+        if lastfetch is given, it is stored for the txes found
+        """
+        logging.debug(f"DB: Getting {len(tx_hashes)} rawtxes")
+        rows = []
+        try:
+            cursor = self.getCursor()
+
+            for i in range(0, len(tx_hashes), chunk_size):
+                chunk = tx_hashes[i:i + chunk_size]
+                cursor.execute(SQL_SELECT_RAWTXES.format(in_params(len(chunk))), chunk)
+                rows += cursor.fetchall()
+            if len(rows) > 0 and lastfetch is not None:
+                cursor.executemany(SQL_UPDATE_RAWTX_LASTFETCH,
+                                   [(lastfetch, row[0]) for row in rows])
+
+        except Exception as e:
+            err_msg = 'error getting raw txes'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+            rows = []
+        finally:
+            self.releaseCursor()
+
+        return {tx['txid']: tx['rawtx'] for tx in self.txes_from_rows(rows)}
+
     def clearRawTxes(self, minTime):
         """
         removes txes with lastfetch older than mintime
@@ -594,7 +879,7 @@ class Database():
         printDbg("Pruning table RAWTXES")
         try:
             cursor = self.getCursor()
-            cursor.execute("DELETE FROM RAWTXES WHERE lastfetch < ?", (minTime,))
+            cursor.execute(SQL_DELETE_OLD_RAWTXES, (minTime,))
 
         except Exception as e:
             err_msg = 'error deleting rawtx from DB'
@@ -602,6 +887,257 @@ class Database():
         finally:
             self.releaseCursor(vacuum=True)
 
+    def clearUnreferencedRawTxes(self, batch_size=DB_PRUNE_BATCH):
+        """
+        removes (in batches) the txes not referenced by any reward UTXO.
+        returns the number of txes removed
+        """
+        printDbg("DB: Removing unreferenced raw txes")
+        num_of_removed = 0
+        while True:
+            try:
+                cursor = self.getCursor()
+                cursor.execute(SQL_DELETE_UNREFERENCED_RAWTXES, (batch_size,))
+                num_of_batch = cursor.rowcount
+
+            except Exception as e:
+                err_msg = 'error removing unreferenced raw txes'
+                printException(getCallerName(), getFunctionName(), err_msg, e.args)
+                self.releaseCursor(rollingBack=True)
+                break
+
+            self.releaseCursor()
+            num_of_removed += num_of_batch
+            if num_of_batch < batch_size:
+                break
+
+        return num_of_removed
+
+    def evictRawTxes(self, max_bytes=DB_RAWTXES_MAX_BYTES, batch_size=DB_PRUNE_BATCH):
+        """
+        removes (in batches) the least recently used txes, until the size of the cache
+        is below max_bytes. returns the number of txes removed
+        """
+        printDbg("DB: Evicting raw txes")
+        num_of_removed = 0
+        while True:
+            try:
+                cursor = self.getCursor()
+                cursor.execute(SQL_SELECT_RAWTXES_SIZE)
+                excess = cursor.fetchone()[0] - max_bytes
+                evicted = []
+                if excess > 0:
+                    cursor.execute(SQL_SELECT_LRU_RAWTXES, (batch_size,))
+                    for tx_hash, size in cursor.fetchall():
+                        if excess <= 0:
+                            break
+                        evicted.append((tx_hash,))
+                        excess -= size
+                    cursor.executemany(SQL_DELETE_RAWTX, evicted)
+
+            except Exception as e:
+                err_msg = 'error evicting raw txes'
+                printException(getCallerName(), getFunctionName(), err_msg, e.args)
+                self.releaseCursor(rollingBack=True)
+                break
+
+            self.releaseCursor()
+            num_of_removed += len(evicted)
+            if len(evicted) == 0:
+                break
+
+        return num_of_removed
+
+    '''
+    Outputs metadata methods
+    '''
+
+    def outputsMeta_from_rows(self, rows):
+        outputsMeta = {}
+
+        for row in rows:
+            meta = {}
+            meta['script_type'] = row[2]
+            meta['staker'] = row[3]
+            meta['coinstake'] = bool(row[4])
+            meta['satoshis'] = row[5]
+            outputsMeta[(row[0], row[1])] = meta
+
+        return outputsMeta
+
+    def addOutputsMeta(self, outputsMeta):
+        """
+        stores the metadata of parsed outputs (dict (tx_hash, tx_ouput_n) -> meta)
+        """
+        logging.debug(f"DB: Adding metadata of {len(outputsMeta)} outputs")
+        try:
+            cursor = self.getCursor()
+
+            cursor.executemany(SQL_INSERT_OUTPUT_META,
+                               [(outpoint[0], outpoint[1], meta['script_type'], meta['staker'],
+                                 meta['coinstake'], meta['satoshis']) for outpoint, meta in outputsMeta.items()])
+
+        except Exception as e:
+            err_msg = 'error adding outputs metadata to DB'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+            self.releaseCursor(rollingBack=True)
+
+        else:
+            self.releaseCursor()
+
+    def getOutputsMeta(self, outpoints, chunk_size=500):
+        """
+        returns the dictionary (tx_hash, tx_ouput_n) -> meta of the given outpoints found in the database
+        """
+        logging.debug(f"DB: Getting metadata of {len(outpoints)} outputs")
+        tx_hashes = list(dict.fromkeys(outpoint[0] for outpoint in outpoints))
+        rows = []
+        try:
+            cursor = self.getCursor()
+
+            for i in range(0, len(tx_hashes), chunk_size):
+                chunk = tx_hashes[i:i + chunk_size]
+                cursor.execute(SQL_SELECT_OUTPUTS_META.format(in_params(len(chunk))), chunk)
+                rows += cursor.fetchall()
+
+        except Exception as e:
+            err_msg = 'error getting outputs metadata'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+            rows = []
+        finally:
+            self.releaseCursor()
+
+        outputsMeta = self.outputsMeta_from_rows(rows)
+        return {outpoint: outputsMeta[outpoint] for outpoint in outpoints if outpoint in outputsMeta}
+
+    def clearUnreferencedOutputsMeta(self):
+        """
+        removes the metadata of the outputs not in REWARDS (spent).
+        returns the number of outputs removed
+        """
+        printDbg("DB: Removing unreferenced outputs metadata")
+        num_of_removed = 0
+        try:
+            cursor = self.getCursor()
+            cursor.execute(SQL_DELETE_UNREFERENCED_OUTPUTS_META)
+            num_of_removed = cursor.rowcount
+
+        except Exception as e:
+            err_msg = 'error removing unreferenced outputs metadata'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+            self.releaseCursor(rollingBack=True)
+
+        else:
+            self.releaseCursor()
+
+        return num_of_removed
+
+    '''
+    Network masternode list methods
+    '''
+
+    def getMnListSnapshot(self, height=None):
+        """
+        rebuilds the network masternode list at the given height (latest snapshot if None)
+        from the stored deltas. returns a dict (tx_hash, tx_ouput_n) -> data
+        """
+        printDbg(f"DB: Getting masternode list snapshot (height {height})")
+        try:
+            cursor = self.getCursor()
+            if height is None:
+                cursor.execute(SQL_SELECT_LAST_MN_SNAPSHOT)
+                height = cursor.fetchone()[0] or 0
+            # latest delta of each outpoint (removed entries have NULL data)
+            cursor.execute(SQL_SELECT_MN_LIST, (height,))
+            rows = cursor.fetchall()
+
+        except Exception as e:
+            err_msg = 'error getting masternode list snapshot'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+            rows = []
+        finally:
+            self.releaseCursor()
+
+        return {(row[0], row[1]): json.loads(row[2]) for row in rows if row[2] is not None}
+
+    def saveMnListSnapshot(self, height, masternodes, time=0, keep=DB_MN_LIST_SNAPSHOTS):
+        """
+        stores the network masternode list (list of listmasternodes entries) at the given height,
+        as the entries added, changed or removed since the previous snapshot.
+        Saved again at the same height, the new deltas are merged with the stored ones.
+        Only the last 'keep' snapshots can be rebuilt: older deltas are compacted
+        to the last one of each entry (see getMnStatusChange for the precision lost).
+        returns the number of entries changed by this call (None if not saved)
+        """
+        printDbg(f"DB: Saving masternode list snapshot (height {height})")
+        try:
+            cursor = self.getCursor()
+            cursor.execute(SQL_SELECT_LAST_MN_SNAPSHOT)
+            last_height = cursor.fetchone()[0] or 0
+            if height < last_height:
+                printDbg(f"DB: snapshot at height {last_height} already saved")
+                self.releaseCursor()
+                return None
+
+            cursor.execute(SQL_SELECT_MN_LIST, (last_height,))
+            stored = {(row[0], row[1]): row[2] for row in cursor.fetchall() if row[2] is not None}
+
+            deltas = []
+            for mn in masternodes:
+                outpoint = (mn.get('txhash'), mn.get('outidx'))
+                data = mn_to_data(mn)
+                if stored.pop(outpoint, None) != data:
+                    deltas.append((outpoint[0], outpoint[1], height, mn.get('status'), data))
+            # entries not in the list anymore
+            deltas += [(outpoint[0], outpoint[1], height, None, None) for outpoint in stored]
+
+            cursor.executemany(SQL_INSERT_MN_DELTA, deltas)
+            cursor.execute(SQL_INSERT_MN_SNAPSHOT, (height, height, time, height))
+
+            # retention
+            cursor.execute(SQL_SELECT_MN_SNAPSHOTS_CUTOFF, (keep - 1,))
+            row = cursor.fetchone()
+            if row is not None:
+                cursor.execute(SQL_COMPACT_MN_DELTAS, (row[0], row[0]))
+                cursor.execute(SQL_DELETE_OLD_MN_SNAPSHOTS, (row[0],))
+
+        except Exception as e:
+            err_msg = 'error saving masternode list snapshot'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+            self.releaseCursor(rollingBack=True)
+            return None
+
+        self.releaseCursor()
+        return len(deltas)
+
+    def getMnStatusChange(self, tx_hash, tx_ouput_n):
+        """
+        returns the last status change of the masternode with the given collateral
+        as a dict {'height', 'time', 'status'} (None if the masternode was never stored).
+        Exact within the last DB_MN_LIST_SNAPSHOTS snapshots. A change older than them is
+        reported at the oldest delta kept by the compaction, which can be a later change of
+        other fields: height and time are then an upper bound of the status change.
+        """
+        try:
+            cursor = self.getCursor()
+            cursor.execute(SQL_SELECT_MN_STATUS_CHANGES, (tx_hash, tx_ouput_n))
+            rows = cursor.fetchall()
+
+        except Exception as e:
+            err_msg = f'error getting status change of {tx_hash}-{tx_ouput_n}'
+            printException(getCallerName(), getFunctionName(), err_msg, e.args)
+            rows = []
+        finally:
+            self.releaseCursor()
+
+        change = None
+        for height, status, time in rows:
+            if change is not None and status != change['status']:
+                break
+            change = {'height': height, 'time': time, 'status': status}
+
+        return change
+
     '''
     Proposals methods
     '''
@@ -638,10 +1174,7 @@ class Database():
         try:
             cursor = self.getCursor()
 
-            cursor.execute("INSERT OR REPLACE INTO MY_VOTES "
-                           "VALUES (?, ?, ?, ?)",
-                           (mn_name, p_hash, vote_index[vote["Vote"]], vote["nTime"])
-                           )
+            cursor.execute(SQL_INSERT_MY_VOTE, (mn_name, p_hash, vote_index[vote["Vote"]], vote["nTime"]))
 
         except Exception as e:
             err_msg = 'error adding my votes to DB'
@@ -650,17 +1183,17 @@ class Database():
         finally:
             self.releaseCursor()
 
+    def proposal_to_row(self, p):
+        return (p.name, p.URL, p.Hash, p.FeeHash, p.BlockStart, p.BlockEnd,
+                p.TotalPayCount, p.RemainingPayCount, p.PaymentAddress,
+                p.Yeas, p.Nays, p.Abstains, p.ToalPayment, p.MonthlyPayment)
+
     def addProposal(self, p):
         logging.debug("DB: Adding proposal")
         try:
             cursor = self.getCursor()
 
-            cursor.execute("INSERT OR REPLACE INTO PROPOSALS "
-                           "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                           (p.name, p.URL, p.Hash, p.FeeHash, p.BlockStart, p.BlockEnd,
-                            p.TotalPayCount, p.RemainingPayCount, p.PaymentAddress,
-                            p.Yeas, p.Nays, p.Abstains, p.ToalPayment, p.MonthlyPayment)
-                           )
+            cursor.execute(SQL_INSERT_PROPOSAL, self.proposal_to_row(p))
 
         except Exception as e:
             err_msg = 'error adding proposal to DB'
@@ -669,16 +1202,34 @@ class Database():
         finally:
             self.releaseCursor()
 
+    def addProposals(self, proposals):
+        """
+        adds a batch of proposals in a single transaction
+        """
+        logging.debug(f"DB: Adding {len(proposals)} proposals")
+        try:
+            cursor = self.getCursor()
+
+            cursor.executemany(SQL_INSERT_PROPOSAL, [self.proposal_to_row(p) for p in proposals])
+
+        except Exception as e:
+            err_msg = 'error adding proposals to DB'
+            printException(getCallerName(), getFunctionName(), err_msg, e)
+            self.releaseCursor(rollingBack=True)
+
+        else:
+            self.releaseCursor()
+
     def getMyVotes(self, p_hash=None):
         try:
             cursor = self.getCursor()
 
             if p_hash is None:
                 printDbg("DB: Getting votes for all proposals")
-                cursor.execute("SELECT * FROM MY_VOTES")
+                cursor.execute(SQL_SELECT_MY_VOTES)
             else:
                 printDbg(f"DB: Getting votes for proposal {p_hash}")
-                cursor.execute("SELECT * FROM MY_VOTES WHERE p_hash = ?", (p_hash,))
+                cursor.execute(SQL_SELECT_PROPOSAL_VOTES, (p_hash,))
             rows = cursor.fetchall()
 
         except Exception as e:
@@ -694,7 +1245,7 @@ class Database():
         printDbg("DB: Getting proposal list")
         try:
             cursor = self.getCursor()
-            cursor.execute("SELECT * FROM PROPOSALS")
+            cursor.execute(SQL_SELECT_PROPOSALS)
             rows = cursor.fetchall()
 
         except Exception as e:
@@ -119,12 +119,13 @@ class LedgerApi(QObject):
                 self.dongle = None
 
     @process_ledger_exceptions
-    def append_inputs_to_TX(self, utxo, bip32_path):
+    def append_inputs_to_TX(self, utxo, bip32_path, raw_tx):
         self.amount += int(utxo['satoshis'])
-        raw_tx = TxCache(self.main_wnd)[utxo['txid']]
+        if raw_tx is None:
+            raise Exception(f"Unable to get raw TX with hash={utxo['txid']}")
 
         # parse the raw transaction, so that we can extract the UTXO locking script we refer to
-        prev_transaction = bitcoinTransaction(bytearray.fromhex(raw_tx))
+        prev_transaction = bitcoinTransaction(bytearray(raw_tx))
 
         utxo_tx_index = utxo['vout']
         if utxo_tx_index < 0 or utxo_tx_index > len(prev_transaction.outputs):
@@ -163,6 +164,8 @@ class LedgerApi(QObject):
             self.amount = 0
             num_of_sigs = sum([len(mnode['utxos']) for mnode in rewardsArray])
             curr_utxo_checked = 0
+            rawtxes = TxCache(self.main_wnd).prefetch([utxo['txid'] for mnode in rewardsArray
+                                                       for utxo in mnode['utxos']])
 
             for mnode in rewardsArray:
                 # Add proper HW path (for current device) on each utxo
@@ -173,7 +176,7 @@ class LedgerApi(QObject):
 
                 # Create a TX input with each utxo
                 for utxo in mnode['utxos']:
-                    self.append_inputs_to_TX(utxo, mnode['path'])
+                    self.append_inputs_to_TX(utxo, mnode['path'], rawtxes.get(utxo['txid']))
                     # completion percent emitted
                     curr_utxo_checked += 1
                     completion = int(95 * curr_utxo_checked / num_of_sigs)
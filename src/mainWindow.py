@@ -24,7 +24,7 @@ from tabMain import TabMain
 from tabMNConf import TabMNConf
 from tabRewards import TabRewards
 from qt.guiHeader import GuiHeader
-from rpcClient import RpcClient
+from rpcPool import RpcPool
 from threads import ThreadFuns
 from watchdogThreads import RpcWatchdog
 
@@ -45,6 +45,9 @@ class MainWindow(QWidget):
     # signal: Proposals list has been reloaded (emitted by loadProposals_thread in tabGovernance)
     sig_ProposalsLoaded = pyqtSignal()
 
+    # signal: status of a masternode (alias) is ready (emitted by updateMNStatus in tabMain)
+    sig_MNStatusLoaded = pyqtSignal(str, object)
+
     def __init__(self, parent, masternode_list, imgDir):
         super(QWidget, self).__init__(parent)
         self.parent = parent
@@ -60,6 +63,7 @@ class MainWindow(QWidget):
         self.hwModel = 0
         self.hwStatusMess = "Not Connected"
         self.rpcClient = None
+        self.rpcPool = RpcPool()
         self.rpcConnected = False
         self.updatingRPCbox = False
         self.rpcStatusMess = "Not Connected"
@@ -511,9 +515,11 @@ class MainWindow(QWidget):
             printDbg(f"Trying to connect to RPC {rpc_protocol}://{rpc_host}...")
 
         try:
-            rpcClient = RpcClient(rpc_protocol, rpc_host, rpc_user, rpc_password)
-            status, statusMess, lastBlock, r_time1, isTestnet = rpcClient.getStatus()
-            isBlockchainSynced, r_time2 = rpcClient.isBlockchainSynced()
+            # the pool keeps the client (and its keep-alive connection) of each server
+            rpcNode = self.rpcPool.getNode(rpc_protocol, rpc_host, rpc_user, rpc_password)
+            rpcClient = rpcNode.client
+            status, statusMess, lastBlock, r_time, isTestnet, isBlockchainSynced = rpcClient.getStatus()
+            rpcNode.updateStatus(status, lastBlock, r_time, isTestnet)
         except Exception as e:
             printException(getCallerName(), getFunctionName(), f"exception updating RPC status: {e}")
             # clear status
@@ -522,15 +528,20 @@ class MainWindow(QWidget):
             return
 
         rpcResponseTime = None
-        if r_time1 is not None and r_time2 != 0:
-            rpcResponseTime = round((r_time1 + r_time2) / 2, 3)
+        if r_time is not None:
+            rpcResponseTime = round(r_time, 3)
+        if fDebug:
+            printDbg(f"RPC connection stats: {rpcClient.getConnectionStats()}")
 
         # Do not update status if the user has selected a different server since the start of updateRPCStatus()
         if rpc_index != self.header.rpcClientsBox.currentIndex():
             return
 
+        self.rpcPool.setPreferred(rpcNode)
+        self.rpcPool.setServers(self.rpcServersList)
+
         with self.lock:
-            self.rpcClient = rpcClient
+            self.rpcClient = self.rpcPool
             self.rpcConnected = status
             self.rpcLastBlock = lastBlock
             self.rpcStatusMess = statusMess
@@ -541,4 +552,12 @@ class MainWindow(QWidget):
                 self.isTestnetRPC = isTestnet
                 self.parent.cache['isTestnetRPC'] = persistCacheSetting('isTestnetRPC', isTestnet)
                 self.apiClient = ApiClient(isTestnet)
+            if status:
+                self.apiClient.setTipHeight(lastBlock)
         self.sig_RPCstatusUpdated.emit(rpc_index, fDebug)
+
+        # Update the other servers of the pool in the background
+        # (the routing uses the last known status of each server meanwhile)
+        self.rpcPool.refresh(wait=False)
+        if fDebug:
+            printDbg(f"RPC pool stats: {self.rpcPool.getStats()}")
@@ -182,11 +182,8 @@ class Masternode(QObject):
         # setup rpc connection
         self.rpcClient = rpcClient
         try:
-            # update protocol version
-            self.protocol_version = self.rpcClient.getProtocolVersion()
-
-            # set current height
-            self.currHeight = self.rpcClient.getBlockCount()
+            # update protocol version and set current height
+            self.protocol_version, self.currHeight = self.rpcClient.getProtocolVersionAndHeight()
         except Exception as e:
             err_msg = "error in startMessage"
             printException(getCallerName(), getFunctionName(), err_msg, e)
@@ -6,38 +6,33 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
+import hashlib
+
 __b58chars = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 __b58base = len(__b58chars)
 b58chars = __b58chars
 
-long = int
-_bchr = lambda x: bytes([x])
-_bord = lambda x: x
+# base58 digits are converted two at a time: divmod by 58^2 on the big integer,
+# with lookup tables of the digit pairs
+B58_PAIR_BASE = __b58base * __b58base
+B58_PAIRS = [a + b for a in __b58chars for b in __b58chars]
+B58_PAIR_VALUES = {pair: i for i, pair in enumerate(B58_PAIRS)}
 
 
 def b58encode(v):
     """
     encode v, which is a string of bytes, to base58.
     """
-    long_value = 0
-    for (i, c) in enumerate(v[::-1]):
-        long_value += (256 ** i) * _bord(c)
-
-    result = ''
-    while long_value >= __b58base:
-        div, mod = divmod(long_value, __b58base)
-        result = __b58chars[mod] + result
-        long_value = div
-    result = __b58chars[long_value] + result
     # Bitcoin does a little leading-zero-compression:
     # leading 0-bytes in the input become leading-1s
-    nPad = 0
-    for c in v:
-        #        if c == '\0': nPad += 1
-        if c == 0:
-            nPad += 1
-        else:
-            break
+    nPad = len(v) - len(v.lstrip(b'\0'))
+    long_value = int.from_bytes(v, 'big')
+
+    pairs = []
+    while long_value > 0:
+        long_value, mod = divmod(long_value, B58_PAIR_BASE)
+        pairs.append(B58_PAIRS[mod])
+    result = ''.join(reversed(pairs)).lstrip(__b58chars[0])
 
     return (__b58chars[0] * nPad) + result
 
@@ -45,26 +40,55 @@ def b58encode(v):
 def b58decode(v, length=None):
     """ decode v into a string of len bytes
     """
+    nPad = len(v) - len(v.lstrip(__b58chars[0]))
+    digits = v[nPad:]
+    if len(digits) % 2 == 1:
+        # leading zero digit, to read the digits in pairs
+        digits = __b58chars[0] + digits
     long_value = 0
-    for (i, c) in enumerate(v[::-1]):
-        long_value += __b58chars.find(c) * (__b58base ** i)
-
-    result = bytes()
-    while long_value >= 256:
-        div, mod = divmod(long_value, 256)
-        result = _bchr(mod) + result
-        long_value = div
-    result = _bchr(long_value) + result
-
-    nPad = 0
-    for c in v:
-        if c == __b58chars[0]:
-            nPad += 1
-        else:
-            break
-
-    result = _bchr(0) * nPad + result
+    try:
+        for i in range(0, len(digits), 2):
+            long_value = long_value * B58_PAIR_BASE + B58_PAIR_VALUES[digits[i:i + 2]]
+    except KeyError as e:
+        raise ValueError(f"Invalid base58 characters {e}")
+
+    result = b'\0' * nPad + long_value.to_bytes((long_value.bit_length() + 7) // 8, 'big')
     if length is not None and len(result) != length:
         return None
 
     return result
+
+
+def b58check(v):
+    """
+    encode v to base58, with a 4-byte (double sha256) checksum.
+    """
+    checksum = hashlib.sha256(hashlib.sha256(v).digest()).digest()[0:4]
+    return b58encode(v + checksum)
+
+
+def b58encode_many(values):
+    """
+    encode a list of byte strings to base58.
+    Repeated values (e.g. the same address in many outputs) are encoded once.
+    """
+    encoded = {v: b58encode(v) for v in dict.fromkeys(bytes(v) for v in values)}
+    return [encoded[bytes(v)] for v in values]
+
+
+def b58check_many(values):
+    """
+    encode a list of byte strings to base58, with checksum (e.g. the payloads of the addresses).
+    Repeated values are hashed and encoded once.
+    """
+    encoded = {v: b58check(v) for v in dict.fromkeys(bytes(v) for v in values)}
+    return [encoded[bytes(v)] for v in values]
+
+
+def b58decode_many(values, length=None):
+    """
+    decode a list of base58 strings (None for the ones not of len bytes).
+    Repeated values are decoded once.
+    """
+    decoded = {v: b58decode(v, length) for v in dict.fromkeys(values)}
+    return [decoded[v] for v in values]
@@ -11,7 +11,7 @@ import hashlib
 
 from constants import WIF_PREFIX, MAGIC_BYTE, TESTNET_WIF_PREFIX, TESTNET_MAGIC_BYTE, \
     STAKE_MAGIC_BYTE, TESTNET_STAKE_MAGIC_BYTE
-from pivx_b58 import b58encode, b58decode
+from pivx_b58 import b58check, b58check_many, b58decode
 
 
 def double_sha256(data):
@@ -38,8 +38,7 @@ def generate_privkey(isTestnet=False):
 def base58fromhex(hexstr, isTestnet):
     base58_secret = TESTNET_WIF_PREFIX if isTestnet else WIF_PREFIX
     data = bytes([base58_secret]) + bytes.fromhex(hexstr)
-    checksum = bitcoin.bin_dbl_sha256(data)[0:4]
-    return b58encode(data + checksum)
+    return b58check(data)
 
 
 def pubkey_to_address(pubkey, isTestnet=False, isCold=False):
@@ -54,8 +53,16 @@ def pubkeyhash_to_address(pkey_hash, isTestnet=False, isCold=False):
     else:
         base58_secret = TESTNET_MAGIC_BYTE if isTestnet else MAGIC_BYTE
     data = bytes([base58_secret]) + pkey_hash
-    checksum = bitcoin.bin_dbl_sha256(data)[0:4]
-    return b58encode(data + checksum)
+    return b58check(data)
+
+
+def pubkeyhashes_to_addresses(pkey_hashes, isTestnet=False, isCold=False):
+    if isCold:
+        base58_secret = TESTNET_STAKE_MAGIC_BYTE if isTestnet else STAKE_MAGIC_BYTE
+    else:
+        base58_secret = TESTNET_MAGIC_BYTE if isTestnet else MAGIC_BYTE
+    prefix = bytes([base58_secret])
+    return b58check_many([prefix + pkey_hash for pkey_hash in pkey_hashes])
 
 
 def wif_to_privkey(string):
@@ -4,22 +4,42 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
+import struct
+
+from bitcoin import bin_hash160
+
 from misc import getCallerName, getFunctionName, printException
 import utils
-from pivx_hashlib import pubkeyhash_to_address
+from pivx_hashlib import pubkeyhash_to_address, pubkeyhashes_to_addresses
+
+
+# struct formats of the fixed size integers
+INT_FORMATS = {(nbytes, byteorder, signed): ("<" if byteorder == "little" else ">") + (c.lower() if signed else c)
+               for nbytes, c in [(1, "B"), (2, "H"), (4, "I"), (8, "Q")]
+               for byteorder in ["little", "big"] for signed in [False, True]}
 
 
-class HexParser():
-    def __init__(self, hex_str):
+class BytesParser():
+    """
+    Reads the raw bytes of a serialized tx (no hex decoding until a field is returned
+    as a string). The buffer is never copied: readBytes returns memoryview slices.
+    """
+    def __init__(self, data):
         self.cursor = 0
-        self.hex_str = hex_str
+        self.buf = memoryview(data)
+
+    def checkRange(self, nbytes):
+        if self.cursor + nbytes > len(self.buf):
+            raise Exception("BytesParser range error")
 
     def readInt(self, nbytes, byteorder="big", signed=False):
-        if self.cursor + nbytes * 2 > len(self.hex_str):
-            raise Exception("HexParser range error")
-        b = bytes.fromhex(self.hex_str[self.cursor:self.cursor + nbytes * 2])
-        res = int.from_bytes(b, byteorder=byteorder, signed=signed)
-        self.cursor += nbytes * 2
+        self.checkRange(nbytes)
+        fmt = INT_FORMATS.get((nbytes, byteorder, signed))
+        if fmt is not None:
+            res = struct.unpack_from(fmt, self.buf, self.cursor)[0]
+        else:
+            res = int.from_bytes(self.buf[self.cursor:self.cursor + nbytes], byteorder=byteorder, signed=signed)
+        self.cursor += nbytes
         return res
 
     def readVarInt(self):
@@ -32,15 +52,21 @@ class HexParser():
             return self.readInt(8, "little")
         return r
 
+    def skip(self, nbytes):
+        self.checkRange(nbytes)
+        self.cursor += nbytes
+
+    def readBytes(self, nbytes):
+        self.checkRange(nbytes)
+        res = self.buf[self.cursor:self.cursor + nbytes]
+        self.cursor += nbytes
+        return res
+
     def readString(self, nbytes, byteorder="big"):
-        if self.cursor + nbytes * 2 > len(self.hex_str):
-            raise Exception("HexParser range error")
-        res = self.hex_str[self.cursor:self.cursor + nbytes * 2]
-        self.cursor += nbytes * 2
+        res = self.readBytes(nbytes)
         if byteorder == "little":
-            splits = [res[i:i + 2] for i in range(0, len(res), 2)]
-            return ''.join(splits[::-1])
-        return res
+            return res[::-1].hex()
+        return res.hex()
 
 
 def IsCoinBase(vin):
@@ -68,15 +94,14 @@ def ParseTxOutput(p, isTestnet=False):
     vout = {}
     vout["value"] = p.readInt(8, "little")
     script_len = p.readVarInt()
+    locking_script = p.readBytes(script_len)
     vout["scriptPubKey"] = {}
-    vout["scriptPubKey"]["hex"] = p.readString(script_len, "big")
+    vout["scriptPubKey"]["hex"] = locking_script.hex()
     vout["scriptPubKey"]["addresses"] = []
     try:
-        locking_script = bytes.fromhex(vout["scriptPubKey"]["hex"])
-
         # add addresses only if P2PKH, P2PK or P2CS
         if len(locking_script) in [25, 35, 51]:
-            add_bytes = utils.extract_pkh_from_locking_script(locking_script)
+            add_bytes = utils.extract_pkh_from_locking_script(bytes(locking_script))
 
             address = pubkeyhash_to_address(add_bytes, isTestnet)
             vout["scriptPubKey"]["addresses"].append(address)
@@ -85,8 +110,16 @@ def ParseTxOutput(p, isTestnet=False):
     return vout
 
 
-def ParseTx(hex_string, isTestnet=False):
-    p = HexParser(hex_string)
+def ParseTx(rawtx, isTestnet=False):
+    """
+    parses a raw tx (bytes-like or hex string)
+    """
+    if isinstance(rawtx, str):
+        rawtx = bytes.fromhex(rawtx)
+    return ReadTx(BytesParser(rawtx), isTestnet)
+
+
+def ReadTx(p, isTestnet=False):
     tx = {}
 
     tx["version"] = p.readInt(4, "little")
@@ -105,20 +138,152 @@ def ParseTx(hex_string, isTestnet=False):
     return tx
 
 
-def IsCoinStake(tx):
-    return tx['vout'][0]["scriptPubKey"]["hex"] == ""
+# Fixed-length script templates:
+# length -> (type, {position: opcode}, offset of the 20-byte hash, offset of the staker hash)
+SCRIPT_TEMPLATES = {
+    25: ("p2pkh", {0: 0x76, 1: 0xa9, 2: 20, 23: 0x88, 24: 0xac}, 3, None),
+    23: ("p2sh", {0: 0xa9, 1: 20, 22: 0x87}, 2, None),
+    51: ("p2cs", {2: 0x7b, 4: 0xd1, 5: 20, 27: 20, 49: 0x88, 50: 0xac}, 28, 6),
+    35: ("p2pk", {0: 33, 34: 0xac}, None, None),
+    67: ("p2pk", {0: 65, 66: 0xac}, None, None),
+}
+# translate tables mapping a byte value to 1 and every other byte to 0
+BYTE_MATCH_TABLES = [bytes(int(i == v) for i in range(256)) for v in range(256)]
+
+
+def MatchTemplate(buf, length, checks):
+    """
+    Matches a packed buffer of scripts with the same length against a template.
+    Each check compares a single column (buf[pos::length]) of all the scripts at once,
+    and the results are combined as big integers (one byte for each script).
+    Returns a bytes object with 1 for the scripts matching every check, 0 otherwise.
+    """
+    num_of_scripts = len(buf) // length
+    flags = int.from_bytes(b'\x01' * num_of_scripts, "big")
+    for pos, opcode in checks.items():
+        flags &= int.from_bytes(buf[pos::length].translate(BYTE_MATCH_TABLES[opcode]), "big")
+    return flags.to_bytes(num_of_scripts, "big")
 
 
-def IsPayToColdStaking(rawtx, out_n):
-    tx = ParseTx(rawtx)
-    script = tx['vout'][out_n]["scriptPubKey"]["hex"]
-    return utils.IsPayToColdStaking(bytes.fromhex(script)), IsCoinStake(tx)
+def ClassifyScripts(scripts):
+    """
+    Classifies a list of scripts (bytes-like) in a single pass.
+    Scripts are grouped by length and each group is packed in a single buffer
+    matched against the fixed-length templates.
+    Returns a list of (script_type, hash, staker_hash) in the same order, where hash is the
+    20-byte key (or script) hash of P2PKH, P2SH, P2PK and P2CS (owner) scripts, and
+    staker_hash the 20-byte staker key hash of P2CS scripts (None otherwise).
+    """
+    res = [None] * len(scripts)
+    groups = {length: [] for length in SCRIPT_TEMPLATES}
+    for i, script in enumerate(scripts):
+        length = len(script)
+        if length in groups:
+            groups[length].append(i)
+        elif length == 0:
+            res[i] = ("empty", None, None)
+        else:
+            res[i] = ("nulldata" if script[0] == 0x6a else "nonstandard", None, None)
 
+    for length, indexes in groups.items():
+        if len(indexes) == 0:
+            continue
+        script_type, checks, offset, staker_offset = SCRIPT_TEMPLATES[length]
+        buf = b''.join([scripts[i] for i in indexes])
+        flags = MatchTemplate(buf, length, checks)
+        if offset is None:
+            hashes = [bin_hash160(buf[k + 1:k + length - 1]) for k in range(0, len(buf), length)]
+        else:
+            hashes = [buf[k:k + 20] for k in range(offset, len(buf), length)]
+        if staker_offset is None:
+            stakers = [None] * len(indexes)
+        else:
+            stakers = [buf[k:k + 20] for k in range(staker_offset, len(buf), length)]
+        for i, match, script_hash, staker_hash, first_byte in zip(indexes, flags, hashes, stakers, buf[::length]):
+            if match:
+                res[i] = (script_type, script_hash, staker_hash)
+            else:
+                res[i] = ("nulldata" if first_byte == 0x6a else "nonstandard", None, None)
+    return res
 
-def GetDelegatedStaker(rawtx, out_n, isTestnet):
-    tx = ParseTx(rawtx)
-    script = tx['vout'][out_n]["scriptPubKey"]["hex"]
-    if not utils.IsPayToColdStaking(bytes.fromhex(script)):
-        return ""
-    pkh = utils.GetDelegatedStaker(bytes.fromhex(script))
-    return pubkeyhash_to_address(pkh, isTestnet, isCold=True)
+
+def GetScriptType(script):
+    return ClassifyScripts([script])[0][0]
+
+
+def GetOutputsMeta(outputs, isTestnet=False):
+    """
+    metadata of a list of outputs (TxView, out_n), classified with a single ClassifyScripts call
+    """
+    classes = ClassifyScripts([view.getScript(out_n) for view, out_n in outputs])
+    # staker addresses encoded in a single batch (the same staker is repeated in many outputs)
+    stakers = iter(pubkeyhashes_to_addresses([staker_hash for _, _, staker_hash in classes
+                                              if staker_hash is not None], isTestnet, isCold=True))
+    res = []
+    for (view, out_n), (script_type, _, staker_hash) in zip(outputs, classes):
+        meta = {}
+        meta['script_type'] = script_type
+        meta['staker'] = ""
+        if staker_hash is not None:
+            meta['staker'] = next(stakers)
+        meta['coinstake'] = view.isCoinStake()
+        meta['satoshis'] = view.getValue(out_n)
+        res.append(meta)
+    return res
+
+
+class TxView():
+    """
+    Lazy view of a raw tx (bytes-like or hex string): a single scan skips the inputs
+    and indexes the outputs (value and script slice). Scripts are decoded,
+    and addresses derived, only for the outputs requested.
+    """
+    def __init__(self, rawtx):
+        if isinstance(rawtx, str):
+            rawtx = bytes.fromhex(rawtx)
+        p = BytesParser(rawtx)
+        self.version = p.readInt(4, "little")
+        num_of_inputs = p.readVarInt()
+        for i in range(num_of_inputs):
+            # prevout, script, sequence
+            p.skip(36)
+            p.skip(p.readVarInt() + 4)
+        num_of_outputs = p.readVarInt()
+        self.outputs = []
+        for i in range(num_of_outputs):
+            value = p.readInt(8, "little")
+            self.outputs.append((value, p.readBytes(p.readVarInt())))
+        self.locktime = p.readInt(4, "little")
+
+    def getValue(self, out_n):
+        return self.outputs[out_n][0]
+
+    def getScript(self, out_n):
+        return self.outputs[out_n][1]
+
+    def isCoinStake(self):
+        return len(self.outputs) > 0 and len(self.getScript(0)) == 0
+
+    def isPayToColdStaking(self, out_n):
+        return GetScriptType(self.getScript(out_n)) == "p2cs"
+
+    def getAddress(self, out_n, isTestnet=False):
+        # address of P2PKH, P2PK or P2CS outputs (None for other scripts)
+        script = bytes(self.getScript(out_n))
+        if len(script) not in [25, 35, 51]:
+            return None
+        return pubkeyhash_to_address(utils.extract_pkh_from_locking_script(script), isTestnet)
+
+    def getDelegatedStaker(self, out_n, isTestnet=False):
+        script = self.getScript(out_n)
+        if not utils.IsPayToColdStaking(script):
+            return ""
+        return pubkeyhash_to_address(bytes(utils.GetDelegatedStaker(script)), isTestnet, isCold=True)
+
+    def getOutputMeta(self, out_n, isTestnet=False):
+        # what the rewards need to know about an output (stored in TX_OUTPUT_META)
+        return GetOutputsMeta([(self, out_n)], isTestnet)[0]
+
+
+def IsCoinStake(tx):
+    return tx['vout'][0]["scriptPubKey"]["hex"] == ""
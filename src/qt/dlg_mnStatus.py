@@ -46,6 +46,9 @@ class Ui_MnStatusDlg(object):
         body.addRow(QLabel("<b>Active Time</b>"), QLabel(sec_to_time(self.statusData['activetime'])))
         body.addRow(QLabel("<b>Last Seen</b>"), QLabel(time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.statusData['lastseen']))))
         body.addRow(QLabel("<b>Last Paid</b>"), QLabel(time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.statusData['lastpaid']))))
+        status_change = self.statusData.get('status_change')
+        if status_change is not None:
+            body.addRow(QLabel("<b>Status Since</b>"), QLabel(f"block {status_change['height']} ({time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(status_change['time']))})"))
         layout.addLayout(body)
         self.okButton = QPushButton('OK')
         self.okButton.clicked.connect(self.accept)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+from constants import API_HOST_RATE, API_HOST_BURST
+
+
+class TokenBucket():
+    """
+    Thread-safe token bucket: up to 'burst' requests at once, then 'rate' requests per second
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        if now > self.last:
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+
+    def waitTime(self, now):
+        # seconds to wait before the next token is available (without taking it)
+        with self.lock:
+            self.refill(now)
+            return max(0, self.blocked_until - now, -(self.tokens - 1) / self.rate)
+
+    def reserve(self):
+        # take a token and return the seconds to wait before using it
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            self.tokens -= 1
+            return max(0, self.blocked_until - now, -self.tokens / self.rate)
+
+    def block(self, seconds):
+        # no tokens for the given seconds (e.g. server asking to retry later)
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter():
+    """
+    Token bucket for each host
+    """
+    def __init__(self, rate=API_HOST_RATE, burst=API_HOST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def getBucket(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        # block until a request to the host of url is allowed
+        return self.getBucket(url).acquire()
+
+
+class KeyScheduler():
+    """
+    Token bucket for each API key: every request gets the key available first
+    (waiting if all of them are exhausted or blocked)
+    """
+    def __init__(self, keys, rate, burst):
+        self.buckets = {key: TokenBucket(rate, burst) for key in keys}
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # take a token of the key available first and return (key, seconds to wait)
+        with self.lock:
+            now = time.monotonic()
+            key = min(self.buckets, key=lambda k: self.buckets[k].waitTime(now))
+            return key, self.buckets[key].reserve()
+
+    def acquire(self):
+        key, wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return key
+
+    def block(self, key, seconds):
+        self.buckets[key].block(seconds)
+
+
+# Rate limiter shared by the explorer API clients
+apiRateLimiter = HostRateLimiter()
@@ -4,43 +4,188 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
-from bitcoinrpc.authproxy import AuthServiceProxy
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException, USER_AGENT
 
+import base64
+import decimal
+from functools import wraps
 import http.client as httplib
+import json
 import ssl
 import threading
+import time
 import certifi
 
-from constants import DEFAULT_PROTOCOL_VERSION, MINIMUM_FEE
-from misc import getCallerName, getFunctionName, printException, printDbg, now, timeThis
+from constants import DEFAULT_PROTOCOL_VERSION, MINIMUM_FEE, RPC_BATCH_SIZE, RPC_CACHE_TIP_MAX_AGE
+from misc import getCallerName, getFunctionName, printException, printDbg, now
 from proposals import Proposal
 
 
 def process_RPC_exceptions(func):
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        try:
-            args[0].httpConnection.connect()
-            return func(*args, **kwargs)
-        except Exception as e:
-            message = "Exception in RPC client"
-            printException(getCallerName(True), getFunctionName(True), message, str(e))
-            # Return a default value based on the expected return structure of the wrapped function
-            if func.__name__ == 'getStatus':
-                return False, "Error: RPC call failed", 0, None, False
-            elif func.__name__ == 'isBlockchainSynced':
-                return False, None
-            # Handle other functions or provide a general default return
-            else:
-                return None
-        finally:
+        client = args[0]
+        with client.lock:
+            client.lastCall.failed = False
             try:
-                args[0].httpConnection.close()
+                reused = client.countCall()
+                try:
+                    return func(*args, **kwargs)
+                except (httplib.HTTPException, ConnectionError) as e:
+                    if not reused:
+                        raise
+                    # keep-alive connection dropped by the server: reconnect and retry once
+                    printDbg(f"RPC: connection lost ({e}). Reconnecting...")
+                    client.httpConnection.close()
+                    client.num_of_handshakes += 1
+                    return func(*args, **kwargs)
+
             except Exception as e:
-                printDbg(e)
-                pass
+                if not isinstance(e, JSONRPCException):
+                    # connection in unknown state
+                    client.httpConnection.close()
+                    client.lastCall.failed = True
+                message = "Exception in RPC client"
+                printException(getCallerName(True), getFunctionName(True), message, str(e))
+                # Return a default value based on the expected return structure of the wrapped function
+                if func.__name__ == 'getStatus':
+                    return False, "Error: RPC call failed", 0, None, False, False
+                # Handle other functions or provide a general default return
+                else:
+                    return None
     return wrapper
 
 
+def cached_by_block(func):
+    """
+    caches the results of a read-only RPC method (by arguments) until the chain tip changes.
+    Called with bypassCache=True, the method skips the cache (and refreshes it).
+    Partial results (lastCall.partial set by the method) are not cached
+    """
+    @wraps(func)
+    def wrapper(*args, bypassCache=False, **kwargs):
+        client = args[0]
+        height = client.getTipHeight()
+        key = (func.__name__, args[1:], tuple(sorted(kwargs.items())))
+        if height is not None and not bypassCache:
+            res = client.cache.get(key, height)
+            if res is not None:
+                client.lastCall.failed = False
+                return res
+        elif bypassCache:
+            client.cache.bypasses += 1
+
+        client.lastCall.partial = False
+        res = func(*args, **kwargs)
+        if res is not None and height is not None and not client.lastCall.partial:
+            client.cache.put(key, height, res)
+        return res
+    return wrapper
+
+
+class RpcCache:
+    """
+    Results of the read-only RPC methods, for a given block height
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.height = None
+        self.items = {}
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def get(self, key, height):
+        with self.lock:
+            if height != self.height:
+                # new block: drop everything
+                self.items.clear()
+                self.height = height
+            res = self.items.get(key)
+            if res is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return res
+
+    def put(self, key, height, value):
+        with self.lock:
+            if height == self.height:
+                self.items[key] = value
+
+    def invalidate(self, methods=None):
+        with self.lock:
+            if not methods:
+                self.items.clear()
+            else:
+                for key in [key for key in self.items if key[0] in methods]:
+                    del self.items[key]
+
+    def stats(self):
+        with self.lock:
+            num_of_lookups = self.hits + self.misses
+            hit_rate = round(self.hits / num_of_lookups, 3) if num_of_lookups > 0 else 0.0
+            return {'height': self.height, 'size': len(self.items), 'hits': self.hits,
+                    'misses': self.misses, 'bypasses': self.bypasses, 'hit_rate': hit_rate}
+
+
+def index_masternodes(masternodes, time_now):
+    # compute the payment queue position of each masternode (in a single pass over the
+    # sorted list) and index the list by collateral outpoint and by address
+    for mn in masternodes:
+        if mn.get('status') == 'ENABLED':
+            # compute masternode score
+            if mn.get('lastpaid') == 0:
+                mn['score'] = mn.get('activetime')
+            else:
+                lastpaid_ago = time_now - mn.get('lastpaid')
+                mn['score'] = min(lastpaid_ago, mn.get('activetime'))
+
+        else:
+            mn['score'] = 0
+
+    # sort masternodes by decreasing score and save the position in the payment queue
+    for pos, mn in enumerate(sorted(masternodes, key=lambda x: x['score'], reverse=True)):
+        mn['queue_pos'] = pos
+
+    mnList = {}
+    mnList['masternodes'] = masternodes
+    mnList['by_outpoint'] = {(mn.get('txhash'), mn.get('outidx')): mn for mn in masternodes}
+    mnList['by_address'] = {mn.get('addr'): mn for mn in masternodes}
+
+    return mnList
+
+
+def proposal_from_json(p):
+    return Proposal(p.get('Name'), p.get('URL'), p.get('Hash'), p.get('FeeHash'), p.get('BlockStart'),
+                    p.get('BlockEnd'), p.get('TotalPaymentCount'), p.get('RemainingPaymentCount'), p.get('PaymentAddress'),
+                    p.get('Yeas'), p.get('Nays'), p.get('Abstains'),
+                    float(p.get('TotalPayment')), float(p.get('MonthlyPayment')))
+
+
+class RpcBatch:
+    """
+    Queue of RPC calls, sent in a single JSON-RPC request.
+    execute() returns the list of (result, error) pairs, in the order of the calls
+    """
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def add(self, method, *params):
+        self.calls.append([method, *params])
+        return len(self.calls) - 1
+
+    def execute(self):
+        results = self.client.executeBatch(self.calls)
+        if results is None:
+            # request failed (exception handled by process_RPC_exceptions)
+            error = {'code': -342, 'message': 'batch request failed'}
+            results = [(None, error)] * len(self.calls)
+        self.calls = []
+        return results
+
+
 class RpcClient:
 
     def __init__(self, rpc_protocol, rpc_host, rpc_user, rpc_password):
@@ -58,12 +203,109 @@ class RpcClient:
             self.httpConnection = httplib.HTTPConnection(host, port, timeout=20)
 
         self.conn = AuthServiceProxy(self.rpc_url, timeout=1000, connection=self.httpConnection)
+        # path of the JSON-RPC requests (same of the proxy)
+        self.url_path = self.conn._AuthServiceProxy__url.path or '/'
+
+        # Keep-alive stats
+        self.num_of_calls = 0
+        self.num_of_handshakes = 0
+        # Outcome of the last call (for each thread)
+        self.lastCall = threading.local()
+
+        # Cache for read-only methods (valid for the chain tip)
+        self.cache = RpcCache()
+        self.tipHeight = None
+        self.tipTime = 0
+
+        # Headers for batch requests (sent directly on httpConnection)
+        self.batch_headers = {
+            'Host': host,
+            'User-Agent': USER_AGENT,
+            'Authorization': b'Basic ' + base64.b64encode(f"{rpc_user}:{rpc_password}".encode('utf8')),
+            'Content-type': 'application/json'}
+
+    def countCall(self):
+        """
+        updates the connection stats before a call.
+        returns True if the (keep-alive) connection is reused
+        """
+        self.num_of_calls += 1
+        if self.httpConnection.sock is None:
+            self.num_of_handshakes += 1
+            return False
+        return True
+
+    def setTip(self, height):
+        if height:
+            self.tipHeight = height
+            self.tipTime = time.time()
+
+    def getTipHeight(self):
+        # current chain tip (checked again with getblockcount, when not recently updated)
+        if self.tipHeight is None or time.time() - self.tipTime > RPC_CACHE_TIP_MAX_AGE:
+            if self.getBlockCount() is None:
+                return None
+        return self.tipHeight
+
+    def invalidateCache(self, *methods):
+        # drop the cached results of the given methods (all, if none is given)
+        self.cache.invalidate(methods)
+
+    def getCacheStats(self):
+        return self.cache.stats()
+
+    def lastCallFailed(self):
+        # True if the last call of the current thread failed for connection errors
+        return getattr(self.lastCall, 'failed', False)
+
+    def getConnectionStats(self):
+        reuse_ratio = 0.0
+        if self.num_of_calls > 0:
+            reuse_ratio = round(1 - self.num_of_handshakes / self.num_of_calls, 3)
+        return {'calls': self.num_of_calls, 'handshakes': self.num_of_handshakes, 'reuse_ratio': reuse_ratio}
+
+    def sendBatch(self, calls):
+        """
+        sends the calls (list of [method, *params]) in a single JSON-RPC request.
+        returns the list of (result, error) pairs, in the same order of the calls.
+        Never returns None: if the request fails, the exception is raised to the caller
+        """
+        batch_data = [{'jsonrpc': '2.0', 'method': call[0], 'params': list(call[1:]), 'id': i}
+                      for i, call in enumerate(calls)]
+        with self.lock:
+            self.httpConnection.request('POST', self.url_path, json.dumps(batch_data), self.batch_headers)
+            http_response = self.httpConnection.getresponse()
+            content_type = http_response.getheader('Content-Type')
+            data = http_response.read()
+        if content_type != 'application/json':
+            raise JSONRPCException({'code': -342, 'message': f"non-JSON HTTP response with "
+                                    f"'{http_response.status} {http_response.reason}' from server"})
+        responses = json.loads(data.decode('utf8'), parse_float=decimal.Decimal)
+        if isinstance(responses, dict):
+            # single error object for the whole batch
+            raise JSONRPCException(responses.get('error') or {'code': -342, 'message': 'invalid batch response'})
+
+        results = [(None, {'code': -343, 'message': 'missing JSON-RPC response'})] * len(calls)
+        for response in responses:
+            results[response['id']] = (response.get('result'), response.get('error'))
+        return results
+
+    def batch(self):
+        return RpcBatch(self)
+
+    @process_RPC_exceptions
+    def executeBatch(self, calls):
+        """
+        sendBatch with the exceptions handled: returns None if the request failed
+        """
+        return self.sendBatch(calls)
 
     @process_RPC_exceptions
     def getBlockCount(self):
         n = 0
         with self.lock:
             n = self.conn.getblockcount()
+            self.setTip(n)
 
         return n
 
@@ -83,6 +325,7 @@ class RpcClient:
 
         return votes
 
+    @cached_by_block
     @process_RPC_exceptions
     def getFeePerKb(self):
         res = MINIMUM_FEE
@@ -105,6 +348,7 @@ class RpcClient:
 
         return mnStatus
 
+    @cached_by_block
     @process_RPC_exceptions
     def getMasternodeCount(self):
         ans = None
@@ -115,38 +359,19 @@ class RpcClient:
 
     @process_RPC_exceptions
     def getMasternodes(self):
+        """
+        network masternode list, with the height of the server that returned it ('height', None if not available)
+        """
         printDbg("RPC: Getting masternode list...")
-        mnList = {}
-        score = []
-        masternodes = []
-        with self.lock:
-            masternodes = self.conn.listmasternodes()
-
-        for mn in masternodes:
-            if mn.get('status') == 'ENABLED':
-                # compute masternode score
-                if mn.get('lastpaid') == 0:
-                    mn['score'] = mn.get('activetime')
-                else:
-                    lastpaid_ago = now() - mn.get('lastpaid')
-                    mn['score'] = min(lastpaid_ago, mn.get('activetime'))
-
-            else:
-                mn['score'] = 0
-
-            score.append(mn)
-
-        # sort masternodes by decreasing score
-        score.sort(key=lambda x: x['score'], reverse=True)
-
-        # save masternode position in the payment queue
-        for mn in masternodes:
-            mn['queue_pos'] = score.index(mn)
-
-        mnList['masternodes'] = masternodes
+        (masternodes, err), (height, _) = self.sendBatch([['listmasternodes'], ['getblockcount']])
+        if err is not None:
+            raise Exception(err.get('message'))
 
+        mnList = index_masternodes(masternodes, now())
+        mnList['height'] = height
         return mnList
 
+    @cached_by_block
     @process_RPC_exceptions
     def getNextSuperBlock(self):
         n = 0
@@ -155,27 +380,40 @@ class RpcClient:
 
         return n
 
+    @cached_by_block
     @process_RPC_exceptions
     def getProposals(self):
         printDbg("RPC: Getting proposals list...")
-        proposals = []
         data = []
         with self.lock:
             # get proposals JSON data
             data = self.conn.getbudgetinfo()
 
-        for p in data:
-            # create proposal Object
-            new_proposal = Proposal(p.get('Name'), p.get('URL'), p.get('Hash'), p.get('FeeHash'), p.get('BlockStart'),
-                                    p.get('BlockEnd'), p.get('TotalPaymentCount'), p.get('RemainingPaymentCount'), p.get('PaymentAddress'),
-                                    p.get('Yeas'), p.get('Nays'), p.get('Abstains'),
-                                    float(p.get('TotalPayment')), float(p.get('MonthlyPayment')))
-            # append object to list
-            proposals.append(new_proposal)
-
         # return proposals list
-        return proposals
+        return [proposal_from_json(p) for p in data]
+
+    @cached_by_block
+    @process_RPC_exceptions
+    def getProposalsAndMnCount(self):
+        """
+        proposals list and masternode count in a single batch request.
+        returns None in place of the item not available
+        """
+        printDbg("RPC: Getting proposals list and masternode count...")
+        (data, err1), (mnCount, err2) = self.sendBatch([['getbudgetinfo'], ['getmasternodecount']])
+        proposals = None
+        if err1 is None:
+            proposals = [proposal_from_json(p) for p in data]
+        else:
+            printDbg(f"RPC: Unable to get proposals: {err1.get('message')}")
+        if err2 is not None:
+            printDbg(f"RPC: Unable to get masternode count: {err2.get('message')}")
+        # not cached: the missing item is requested again at the next call
+        self.lastCall.partial = err1 is not None or err2 is not None
+
+        return proposals, mnCount
 
+    @cached_by_block
     @process_RPC_exceptions
     def getProposalsProjection(self):
         printDbg("RPC: Getting proposals projection...")
@@ -207,6 +445,19 @@ class RpcClient:
 
         return res
 
+    @process_RPC_exceptions
+    def getProtocolVersionAndHeight(self):
+        """
+        protocol version and current block height in a single batch request
+        """
+        (info, err1), (height, err2) = self.sendBatch([['getinfo'], ['getblockcount']])
+        for err in [err1, err2]:
+            if err is not None:
+                raise Exception(err.get('message'))
+        self.setTip(height)
+
+        return int(info.get('protocolversion')), height
+
     @process_RPC_exceptions
     def getRawTransaction(self, txid):
         res = None
@@ -215,41 +466,59 @@ class RpcClient:
 
         return res
 
+    @process_RPC_exceptions
+    def getRawTransactions(self, txids, batch_size=RPC_BATCH_SIZE):
+        """
+        fetches the raw txes with batched requests.
+        returns the dictionary txid -> rawtx (hex) of the txes found
+        """
+        res = {}
+        for i in range(0, len(txids), batch_size):
+            chunk = txids[i:i + batch_size]
+            results = self.sendBatch([['getrawtransaction', txid] for txid in chunk])
+            for txid, (rawtx, error) in zip(chunk, results):
+                if error is None:
+                    res[txid] = rawtx
+                else:
+                    printDbg(f"RPC: Unable to get raw TX {txid}: {error.get('message')}")
+
+        return res
+
     @process_RPC_exceptions
     def getStatus(self):
+        """
+        status probe (getinfo, getblockcount and mnsync status) in a single batch request
+        """
         status = False
         statusMess = "Unable to connect to a PIVX RPC server.\n"
         statusMess += "Either the local PIVX wallet is not open, or the remote RPC server is not responding."
-        n = 0
-        response_time = None
-        with self.lock:
-            isTestnet = self.conn.getinfo()['testnet']
-            n, response_time = timeThis(self.conn.getblockcount)
-            if n is None:
-                n = 0
+        isBlockchainSynced = False
+        start = time.time()
+        results = self.sendBatch([['getinfo'], ['getblockcount'], ['mnsync', 'status']])
+        response_time = time.time() - start
+        (info, err), (n, _), (syncStatus, _) = results
+        if err is not None:
+            raise Exception(err.get('message'))
+        isTestnet = info['testnet']
+        if n is None:
+            n = 0
+        self.setTip(n)
+        if syncStatus is not None:
+            isBlockchainSynced = syncStatus.get("IsBlockchainSynced")
 
         if n > 0:
             status = True
             statusMess = "Connected to PIVX Blockchain"
 
-        return status, statusMess, n, response_time, isTestnet
-
-    @process_RPC_exceptions
-    def isBlockchainSynced(self):
-        res = False
-        response_time = None
-        with self.lock:
-            status, response_time = timeThis(self.conn.mnsync, 'status')
-            if status is not None:
-                res = status.get("IsBlockchainSynced")
-
-        return res, response_time
+        return status, statusMess, n, response_time, isTestnet, isBlockchainSynced
 
     @process_RPC_exceptions
     def mnBudgetRawVote(self, mn_tx_hash, mn_tx_index, proposal_hash, vote, time, vote_sig):
         res = None
         with self.lock:
             res = self.conn.mnbudgetrawvote(mn_tx_hash, mn_tx_index, proposal_hash, vote, time, vote_sig)
+            # vote counts changed
+            self.invalidateCache('getProposals', 'getProposalsAndMnCount')
 
         return res
 
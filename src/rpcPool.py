@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+from functools import partial
+import queue
+import threading
+import time
+
+from constants import RPC_POOL_PROBE_TIMEOUT, RPC_POOL_MAX_LAG, RPC_POOL_MAX_TRIES, RPC_POOL_EWMA_WEIGHT
+from misc import printDbg
+from rpcClient import RpcClient
+
+# Methods sent to every healthy server
+WRITE_METHODS = ['sendRawTransaction', 'relaymasternodebroadcast', 'mnBudgetRawVote']
+
+
+def server_url(protocol, host, user, password):
+    return f"{protocol}://{user}:{password}@{host}"
+
+
+class RpcNode():
+    """
+    RPC client of a pool server, with its health stats
+    """
+    def __init__(self, protocol, host, user, password):
+        self.host = host
+        self.client = RpcClient(protocol, host, user, password)
+        self.connected = False
+        self.isTestnet = None
+        self.height = 0
+        self.latency = None
+        self.error_rate = 0.0
+        # background tasks (probe, write) not returned yet
+        self.tasks = set()
+        self.lock = threading.Lock()
+
+    def updateStats(self, ok, latency=None):
+        w = RPC_POOL_EWMA_WEIGHT
+        self.error_rate = w * (0.0 if ok else 1.0) + (1 - w) * self.error_rate
+        if ok and latency is not None:
+            self.latency = latency if self.latency is None else w * latency + (1 - w) * self.latency
+
+    def updateStatus(self, status, height, latency, isTestnet):
+        self.connected = status
+        if status:
+            self.height = height
+            self.isTestnet = isTestnet
+        self.updateStats(status, latency)
+
+    def probe(self):
+        status, _, height, latency, isTestnet, _ = self.client.getStatus()
+        self.updateStatus(status, height, latency, isTestnet)
+
+    def startTask(self, name, target):
+        """
+        runs target in a background thread, unless the previous task with the same name
+        is still running (e.g. blocked on an unresponsive server).
+        returns the thread (None if skipped)
+        """
+        with self.lock:
+            if name in self.tasks:
+                return None
+            self.tasks.add(name)
+
+        def run():
+            try:
+                target()
+            finally:
+                with self.lock:
+                    self.tasks.discard(name)
+
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        return t
+
+    def score(self):
+        # lower is better
+        latency = self.latency if self.latency is not None else RPC_POOL_PROBE_TIMEOUT
+        return latency * (1 + 4 * self.error_rate)
+
+    def call(self, method, *args, **kwargs):
+        res = getattr(self.client, method)(*args, **kwargs)
+        failed = self.client.lastCallFailed()
+        # latency is measured only by the status probes (calls have different costs)
+        self.updateStats(not failed)
+        return res, failed
+
+
+class RpcPool():
+    """
+    Keeps an RPC client for each configured server and routes the calls (with the
+    same interface of RpcClient) on the servers of the network of the selected one:
+    read-only calls go to the healthiest server (lowest latency and error rate, not behind
+    with the blocks), writes are sent to every healthy server.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.nodes = {}
+        self.preferred = None
+
+    def __getattr__(self, name):
+        if not callable(getattr(RpcClient, name)):
+            raise AttributeError(name)
+        if name in WRITE_METHODS:
+            return partial(self.fanOut, name)
+        return partial(self.route, name)
+
+    def getNode(self, protocol, host, user, password):
+        # return the node of the server (add it to the pool if needed)
+        url = server_url(protocol, host, user, password)
+        with self.lock:
+            if url not in self.nodes:
+                self.nodes[url] = RpcNode(protocol, host, user, password)
+            return self.nodes[url]
+
+    def setServers(self, servers):
+        # keep the nodes of the given servers (list of dicts from the database) only
+        urls = [server_url(s['protocol'], s['host'], s['user'], s['password']) for s in servers]
+        for s in servers:
+            self.getNode(s['protocol'], s['host'], s['user'], s['password'])
+        with self.lock:
+            for url in [url for url in self.nodes if url not in urls]:
+                if self.nodes[url] is not self.preferred:
+                    del self.nodes[url]
+
+    def setPreferred(self, node):
+        with self.lock:
+            self.preferred = node
+
+    def refresh(self, timeout=RPC_POOL_PROBE_TIMEOUT, wait=True):
+        # probe the other servers concurrently (the slow ones are left running in the background,
+        # and not probed again until their last probe returns).
+        # With wait=False, the probes are started and left running (the status is read by the routing)
+        with self.lock:
+            nodes = [n for n in self.nodes.values() if n is not self.preferred]
+        threads = []
+        for n in nodes:
+            t = n.startTask('probe', n.probe)
+            if t is None:
+                printDbg(f"RPC pool: {n.host} still probing")
+            else:
+                threads.append(t)
+        if not wait:
+            return
+        deadline = time.time() + timeout
+        for t in threads:
+            t.join(max(0, deadline - time.time()))
+
+    def healthyNodes(self):
+        with self.lock:
+            nodes = list(self.nodes.values())
+            preferred = self.preferred
+        if preferred is None:
+            return []
+        candidates = [n for n in nodes if n.connected and n.isTestnet == preferred.isTestnet]
+        if len(candidates) == 0:
+            return [preferred]
+        max_height = max([n.height for n in candidates])
+        healthy = [n for n in candidates if n.height >= max_height - RPC_POOL_MAX_LAG]
+        healthy.sort(key=lambda n: n.score())
+        return healthy
+
+    def route(self, method, *args, **kwargs):
+        res = None
+        for node in self.healthyNodes()[:RPC_POOL_MAX_TRIES]:
+            res, failed = node.call(method, *args, **kwargs)
+            if not failed:
+                break
+            printDbg(f"RPC pool: {method} failed on {node.host}")
+        return res
+
+    def fanOut(self, method, *args, **kwargs):
+        # return the first valid result, without waiting for the slower servers
+        # (servers with a previous write still running are skipped)
+        results = queue.Queue()
+
+        def send(node):
+            res = None
+            try:
+                res = node.call(method, *args, **kwargs)[0]
+            finally:
+                results.put(res)
+
+        num_of_sent = 0
+        for node in self.healthyNodes():
+            if node.startTask('write', partial(send, node)) is None:
+                printDbg(f"RPC pool: {method} skipped on {node.host} (previous write still running)")
+            else:
+                num_of_sent += 1
+        for _ in range(num_of_sent):
+            res = results.get()
+            if res is not None:
+                return res
+        return None
+
+    def invalidateCache(self, *methods):
+        with self.lock:
+            nodes = list(self.nodes.values())
+        for node in nodes:
+            node.client.invalidateCache(*methods)
+
+    def getStats(self):
+        with self.lock:
+            return {n.host: {'connected': n.connected, 'height': n.height, 'latency': n.latency,
+                             'error_rate': round(n.error_rate, 3)} for n in self.nodes.values()}
@@ -73,9 +73,11 @@ class App(QMainWindow):
             self.db.clearTable('MASTERNODES')
         if start_args.clearTxCache:
             self.db.clearTable('RAWTXES')
+        if start_args.dbQueryPlans:
+            self.db.printQueryPlans()
 
-        # Clear Rewards and Governance DB (in case of forced shutdown)
-        self.db.clearTable('REWARDS')
+        # Clear Governance DB (in case of forced shutdown).
+        # Rewards are kept: the first reload of the session only applies the UTXO difference
         self.db.clearTable('PROPOSALS')
         self.db.clearTable('MY_VOTES')
 
@@ -178,14 +180,13 @@ class App(QMainWindow):
         # persist cache
         saveCacheSettings(self.cache)
 
-        # Clear Rewards and Governance DB
+        # Clear Governance DB
         try:
             self.db.openDB()
         except Exception:
             pass
-        self.db.removeTable('REWARDS')
-        self.db.removeTable('PROPOSALS')
-        self.db.removeTable('MY_VOTES')
+        self.db.clearTable('PROPOSALS')
+        self.db.clearTable('MY_VOTES')
 
         # close database
         self.db.close()
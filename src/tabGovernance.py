@@ -171,7 +171,7 @@ class TabGovernance():
         self.ui.proposalBox.setSortingEnabled(True)
         self.ui.proposalBox.sortByColumn(3, Qt.DescendingOrder)
 
-    def loadProposals_thread(self, ctrl):
+    def loadProposals_thread(self, ctrl, bypassCache=False):
         if not self.caller.rpcConnected:
             printException(f"{getCallerName()} {getFunctionName()} RPC server not connected")
             return
@@ -181,10 +181,10 @@ class TabGovernance():
         self.caller.parent.db.clearTable('PROPOSALS')
         self.proposalsLoaded = False
 
-        proposals = self.caller.rpcClient.getProposals()
-        for p in proposals:
-            self.caller.parent.db.addProposal(p)
-        num_of_masternodes = self.caller.rpcClient.getMasternodeCount()
+        proposals, num_of_masternodes = self.caller.rpcClient.getProposalsAndMnCount(
+            bypassCache=bypassCache) or (None, None)
+        if proposals is not None:
+            self.caller.parent.db.addProposals(proposals)
 
         if num_of_masternodes is None:
             printDbg("Total number of masternodes not available. Background coloring not accurate")
@@ -214,7 +214,8 @@ class TabGovernance():
 
     def onRefreshProposals(self):
         self.ui.resetStatusLabel()
-        ThreadFuns.runInThread(self.loadProposals_thread, (), )
+        # explicit refresh: skip the cached answer
+        ThreadFuns.runInThread(self.loadProposals_thread, (True,), )
 
     def onToggleExpiring(self):
         if self.ui.toggleExpiring_btn.text() == "Hide Expiring":
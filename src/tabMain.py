@@ -4,16 +4,16 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import simplejson as json
-import time
 
-from PyQt5.Qt import QApplication
 from PyQt5.QtWidgets import QMessageBox
 
+from constants import MN_STATUS_WORKERS
 from masternode import Masternode
 from misc import printDbg, printException, printOK, getCallerName, getFunctionName, \
-    removeMNfromList, myPopUp, myPopUp_sb
+    removeMNfromList, myPopUp, myPopUp_sb, now
 from qt.gui_tabMain import TabMain_gui
 from qt.dlg_mnStatus import MnStatus_dlg
 from qt.dlg_sweepAll import SweepAll_dlg
@@ -39,26 +39,10 @@ class TabMain:
             self.ui.btn_edit[name].clicked.connect(lambda: self.onEditMN())
             self.ui.btn_start[name].clicked.connect(lambda: self.onStartMN())
             self.ui.btn_rewards[name].clicked.connect(lambda: self.onRewardsMN())
+        # Connect Signals
+        self.caller.sig_MNStatusLoaded.connect(self.displayMNStatus)
 
-    def displayMNlistUpdated(self):
-        for masternode in self.caller.masternode_list:
-            printDbg(f"Checking {masternode['name']} ({masternode['collateral'].get('txid')})...")
-            self.displayMNStatus(masternode)
-            time.sleep(0.1)
-
-    def displayMNStatus(self, currMN):
-        statusData = None
-        for mn in self.all_masternodes.get('masternodes'):
-            # find the balance of currMN and display it
-            if mn.get('txhash') == currMN['collateral'].get('txid') and mn.get('outidx') == currMN['collateral'].get('txidn'):
-                statusData = mn
-                try:
-                    statusData['balance'] = self.caller.apiClient.getBalance(mn.get('addr'))
-                except Exception as e:
-                    err_msg = f"error getting balance of {mn.get('addr')}"
-                    printException(f"{getCallerName()}", f"{getFunctionName()}", f"{err_msg}", f"{e}")
-
-        masternode_alias = currMN['name']
+    def displayMNStatus(self, masternode_alias, statusData):
         self.ui.btn_details[masternode_alias].disconnect()
         self.ui.btn_details[masternode_alias].clicked.connect(lambda: self.onDisplayStatusDetails(masternode_alias, statusData))
         self.ui.btn_details[masternode_alias].show()
@@ -72,7 +56,7 @@ class TabMain:
             self.ui.btn_details[masternode_alias].setEnabled(False)
         else:
             display_text = ""
-            if statusData['balance'] is not None:
+            if statusData.get('balance') is not None:
                 self.ui.mnBalance[masternode_alias].setText(f'&nbsp;<span style="color:purple">{statusData["balance"]} PIV</span>')
                 self.ui.mnBalance[masternode_alias].show()
             printOK(f"Got status {statusData['status']} for {masternode_alias}")
@@ -80,7 +64,7 @@ class TabMain:
                 self.ui.mnLed[masternode_alias].setPixmap(self.caller.ledGreenV_icon)
                 display_text += f'<span style="color:green">{statusData["status"]}</span>&nbsp;&nbsp;'
                 position = statusData.get('queue_pos')
-                total_count = len(self.all_masternodes.get('masternodes'))
+                total_count = statusData.get('total_count')
                 display_text += f'{position}/{total_count}'
 
                 self.ui.mnStatusProgress[masternode_alias].setRange(0, total_count)
@@ -93,7 +77,6 @@ class TabMain:
             self.ui.mnStatusLabel[masternode_alias].setText(display_text)
             self.ui.mnStatusLabel[masternode_alias].show()
             self.ui.btn_details[masternode_alias].setEnabled(True)
-        QApplication.processEvents()
 
     def onCheckAllMN(self):
         if not self.caller.rpcConnected:
@@ -107,7 +90,7 @@ class TabMain:
             return
         try:
             printDbg("Check-All pressed")
-            ThreadFuns.runInThread(self.updateAllMasternodes_thread, (), self.displayMNlistUpdated)
+            ThreadFuns.runInThread(self.updateAllMasternodes_thread, ())
 
         except Exception as e:
             err_msg = "error in checkAllMN"
@@ -286,4 +269,36 @@ class TabMain:
             # wait for signal when masternode.work is ready then ---> sendBroadcast
 
     def updateAllMasternodes_thread(self, ctrl):
-        self.all_masternodes = self.caller.rpcClient.getMasternodes()
+        self.all_masternodes = self.caller.rpcClient.getMasternodes() or {}
+        if self.all_masternodes.get('height') is not None:
+            # store the changes of the network list (at the height of the server that returned it)
+            changes = self.caller.parent.db.saveMnListSnapshot(self.all_masternodes['height'],
+                                                               self.all_masternodes['masternodes'], now())
+            printDbg(f"Masternode list: {changes} entries changed")
+        # get the status of my masternodes concurrently (each one displayed when ready)
+        with ThreadPoolExecutor(max_workers=MN_STATUS_WORKERS) as executor:
+            for currMN in self.caller.masternode_list:
+                executor.submit(self.updateMNStatus, currMN)
+
+    def updateMNStatus(self, currMN):
+        printDbg(f"Checking {currMN['name']} ({currMN['collateral'].get('txid')})...")
+        try:
+            # find currMN in the network list (by collateral outpoint)
+            outpoint = (currMN['collateral'].get('txid'), currMN['collateral'].get('txidn'))
+            statusData = self.all_masternodes.get('by_outpoint', {}).get(outpoint)
+            if statusData is not None:
+                statusData['total_count'] = len(self.all_masternodes['masternodes'])
+                statusData['status_change'] = self.caller.parent.db.getMnStatusChange(*outpoint)
+                # find the balance of currMN
+                try:
+                    statusData['balance'] = self.caller.apiClient.getBalance(statusData.get('addr'))
+                except Exception as e:
+                    err_msg = f"error getting balance of {statusData.get('addr')}"
+                    printException(f"{getCallerName()}", f"{getFunctionName()}", f"{err_msg}", f"{e}")
+
+        except Exception as e:
+            err_msg = f"error getting status of {currMN['name']}"
+            printException(f"{getCallerName()}", f"{getFunctionName()}", f"{err_msg}", f"{e}")
+            statusData = None
+
+        self.caller.sig_MNStatusLoaded.emit(currMN['name'], statusData)
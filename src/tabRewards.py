@@ -12,13 +12,14 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QMessageBox, QTableWidgetItem, QHeaderView
 
+from apiSession import apiSession
 from constants import MINIMUM_FEE
 from misc import printDbg, printError, printException, getCallerName, getFunctionName, \
     persistCacheSetting, myPopUp, myPopUp_sb, DisconnectedException, checkTxInputs
-from pivx_parser import ParseTx, IsPayToColdStaking, GetDelegatedStaker
+from pivx_parser import ParseTx, TxView, GetOutputsMeta
 from qt.gui_tabRewards import TabRewards_gui
 from threads import ThreadFuns
-from txCache import TxCache
+from txCache import TxCache, memCache
 from utils import checkPivxAddr
 
 
@@ -29,6 +30,8 @@ class TabRewards:
         # --- Lock for loading UTXO thread
         self.runInThread = ThreadFuns.runInThread
         self.Lock = threading.Lock()
+        # rewards in the DB synced with the explorer in this session (else stored by the previous one)
+        self.utxosSynced = False
 
         # --- Initialize Selection
         self.selectedRewards = None
@@ -173,59 +176,110 @@ class TabRewards:
 
     def load_utxos_thread(self, ctrl):
         with self.Lock:
-            # clear rewards DB
             printDbg("Updating rewards...")
-            self.caller.parent.db.clearTable('REWARDS')
-            self.caller.parent.db.clearTable('MY_VOTES')
 
             # If rpc is not connected and hw device is Ledger, warn and return.
             if not self.caller.rpcConnected and self.caller.hwModel == 0:
                 printError(f"{getCallerName()}", f"{getFunctionName()}", 'PIVX daemon not connected - Unable to update UTXO list')
                 return
 
-            total_num_of_utxos = 0
-            mn_rewards = {}
-            for mn in self.caller.masternode_list:
-                # Load UTXOs from API client
-                rewards = self.caller.apiClient.getAddressUtxos(mn['collateral'].get('address'))
-
-                if rewards is None:
-                    printError(f"{getCallerName()}", f"{getFunctionName()}", 'API client not responding.')
-                    return
-
-                mn_rewards[mn['name']] = rewards
-                total_num_of_utxos += len(rewards)
-
-            printDbg(f"Number of UTXOs to load: {total_num_of_utxos}")
-            curr_utxo = 0
+            # Load UTXOs from API client (concurrently for each collateral address)
+            addresses = [mn['collateral'].get('address') for mn in self.caller.masternode_list]
+            address_utxos, failed = self.caller.apiClient.getAddressesUtxos(addresses)
+            if len(address_utxos) == 0 and len(failed) > 0:
+                printError(f"{getCallerName()}", f"{getFunctionName()}", 'API client not responding.')
+                return
 
-            for mn in mn_rewards:
-                for utxo in mn_rewards[mn]:
+            explorer_utxos = {}
+            failed_names = []
+            for mn in self.caller.masternode_list:
+                address = mn['collateral'].get('address')
+                if address not in address_utxos:
+                    failed_names.append(mn['name'])
+                    continue
+                for utxo in address_utxos[address]:
                     # Add mn_name to UTXO
-                    utxo['mn_name'] = mn
-                    # Get raw tx
-                    rawtx = TxCache(self.caller)[utxo['txid']]
-                    if rawtx is None:
-                        printDbg(f"Unable to get raw TX with hash={utxo['txid']} from RPC server.")
-                        # Don't save UTXO if raw TX is unavailable
-                        mn_rewards[mn].remove(utxo)
-                        continue
-                    utxo['raw_tx'] = rawtx
-                    utxo['staker'] = ""
-                    p2cs, utxo['coinstake'] = IsPayToColdStaking(rawtx, utxo['vout'])
-                    if p2cs:
-                        utxo['staker'] = GetDelegatedStaker(rawtx, utxo['vout'], self.caller.isTestnetRPC)
-                    # Add utxo to database
-                    self.caller.parent.db.addReward(utxo)
-
-                    # emit percent
-                    percent = int(100 * curr_utxo / total_num_of_utxos)
-                    self.caller.sig_UTXOsLoading.emit(percent)
-                    curr_utxo += 1
+                    explorer_utxos[(utxo['txid'], utxo['vout'])] = dict(utxo, mn_name=mn['name'])
+
+            if len(failed_names) > 0:
+                # keep the stored rewards of these masternodes
+                printError(f"{getCallerName()}", f"{getFunctionName()}",
+                           f"Unable to get the UTXOs of {', '.join(failed_names)}. Using the stored ones.")
+
+            # Compare with the UTXOs already in the database
+            stored_utxos = {(r['txid'], r['vout']): r for r in self.caller.parent.db.getRewardsList()}
+            removed = [outpoint for outpoint in stored_utxos
+                       if outpoint not in explorer_utxos and stored_utxos[outpoint]['mn_name'] not in failed_names]
+            updated = [utxo for outpoint, utxo in explorer_utxos.items()
+                       if outpoint in stored_utxos
+                       and (utxo['confirmations'] != stored_utxos[outpoint]['confirmations']
+                            or utxo['mn_name'] != stored_utxos[outpoint]['mn_name'])]
+            new_utxos = [utxo for outpoint, utxo in explorer_utxos.items() if outpoint not in stored_utxos]
+
+            total_num_of_utxos = len(new_utxos)
+            printDbg(f"Number of UTXOs to load: {total_num_of_utxos} "
+                     f"(removed: {len(removed)} - updated: {len(updated)})")
+            added = []
+
+            # Output metadata (coinstake, staker) stored when the tx was first parsed
+            db = self.caller.parent.db
+            outputs_meta = db.getOutputsMeta([(utxo['txid'], utxo['vout']) for utxo in new_utxos])
+            new_meta = {}
+
+            # Load the raw txes to parse (cache misses) with batch requests
+            rawtxes = TxCache(self.caller).prefetch([utxo['txid'] for utxo in new_utxos
+                                                     if (utxo['txid'], utxo['vout']) not in outputs_meta])
+
+            # Index the raw txes of the misses, then classify their outputs with a single batch
+            misses = []
+            for curr_utxo, utxo in enumerate(new_utxos):
+                # emit percent
+                percent = int(100 * curr_utxo / total_num_of_utxos)
+                self.caller.sig_UTXOsLoading.emit(percent)
+
+                outpoint = (utxo['txid'], utxo['vout'])
+                if outpoint in outputs_meta:
+                    continue
+                # Get raw tx
+                rawtx = rawtxes.get(utxo['txid'])
+                if rawtx is None:
+                    printDbg(f"Unable to get raw TX with hash={utxo['txid']} from RPC server.")
+                    # Don't save UTXO if raw TX is unavailable
+                    continue
+                misses.append((outpoint, TxView(rawtx), utxo['vout']))
+
+            parsed_meta = GetOutputsMeta([(view, vout) for _, view, vout in misses], self.caller.isTestnetRPC)
+            for (outpoint, _, _), meta in zip(misses, parsed_meta):
+                outputs_meta[outpoint] = new_meta[outpoint] = meta
+
+            for utxo in new_utxos:
+                meta = outputs_meta.get((utxo['txid'], utxo['vout']))
+                if meta is None:
+                    continue
+                utxo['coinstake'] = meta['coinstake']
+                utxo['staker'] = meta['staker']
+                added.append(utxo)
+
+            printDbg(f"Outputs metadata: {len(added) - len(new_meta)} stored - {len(new_meta)} parsed")
+            db.addOutputsMeta(new_meta)
+
+            # Apply the difference to the database (single transaction)
+            self.caller.parent.db.syncRewards(added, removed, updated)
+            self.utxosSynced = True
 
             printDbg("--# REWARDS table updated")
             self.caller.sig_UTXOsLoading.emit(100)
 
+            # Prune the raw txes cache (unreferenced first, then least recently used)
+            num_of_removed = self.caller.parent.db.clearUnreferencedRawTxes()
+            num_of_removed += self.caller.parent.db.evictRawTxes()
+            printDbg(f"Raw txes removed from cache: {num_of_removed}")
+            db.clearUnreferencedOutputsMeta()
+            printDbg(f"Raw txes in memory: {memCache.stats()}")
+            printDbg(f"Explorer API connections: {apiSession.getStats()}")
+            printDbg(f"Explorer API backends: {self.caller.apiClient.getStats()}")
+            printDbg(f"Explorer API cache: {self.caller.apiClient.getCacheStats()}")
+
     def onCancel(self):
         self.ui.rewardsList.box.clearSelection()
         self.selectedRewards = None
@@ -256,6 +310,9 @@ class TabRewards:
             if not isInitializing:
                 self.ui.resetStatusLabel()
                 self.display_mn_utxos()
+                if not self.utxosSynced:
+                    # rewards stored by the previous session: sync them with the explorer
+                    self.onReloadUTXOs()
 
     def onSelectAllRewards(self):
         self.ui.rewardsList.box.selectAll()
@@ -435,7 +492,7 @@ class TabRewards:
                 else:
                     decodedTx = None
                     try:
-                        decodedTx = ParseTx(tx_hex, self.caller.isTestnetRPC)
+                        decodedTx = ParseTx(serialized_tx, self.caller.isTestnetRPC)
                         destination = decodedTx.get("vout")[0].get("scriptPubKey").get("addresses")[0]
                         amount = decodedTx.get("vout")[0].get("value")
                         message = f'<p>Broadcast signed transaction?</p><p>Destination address:<br><b>{destination}</b></p>'
@@ -456,6 +513,8 @@ class TabRewards:
                         if txid is None:
                             raise Exception("Unable to send TX - connection to RPC server lost.")
                         printDbg(f"Transaction sent. ID: {txid}")
+                        # the explorer responses for our addresses are outdated
+                        self.caller.apiClient.invalidateCache()
                         mess2_text = "<p>Transaction successfully sent.</p>"
                         mess2 = QMessageBox(QMessageBox.Information, 'transaction Sent', f"{mess2_text}", parent=self.caller)
                         mess2.setDetailedText(txid)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+"""
+Per-operation latency of the Database methods.
+Compares the pooled WAL connections against the previous behaviour
+(new connection for each cursor, commit and close on release).
+Run from the src directory:  python tests/benchDatabase.py [num_of_ops]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from testDatabaseMethods import DummyApp, dummyUtxo  # noqa: E402
+
+
+class LegacyDatabase(Database):
+    # connect / commit / close once per operation (rollback journal, synchronous FULL)
+    def getConnection(self):
+        if getattr(self.local, 'conn', None) is None:
+            self.local.conn = sqlite3.connect(self.file_name)
+        return self.local.conn
+
+    def releaseCursor(self, rollingBack=False, vacuum=False):
+        conn = self.local.conn
+        if rollingBack:
+            conn.rollback()
+        else:
+            conn.commit()
+            if vacuum:
+                conn.execute('vacuum')
+        conn.close()
+        self.local.conn = None
+
+
+def timeOps(label, fun, num_of_ops):
+    start = time.perf_counter()
+    for i in range(num_of_ops):
+        fun(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {num_of_ops:>6} ops  {1e6 * elapsed / num_of_ops:>10.1f} us/op")
+
+
+def bench(db_class, num_of_ops):
+    with tempfile.TemporaryDirectory() as tmpDir:
+        db = db_class(DummyApp(), os.path.join(tmpDir, 'bench.db'))
+        db.openDB()
+        print(f"--- {db_class.__name__}")
+        timeOps("addReward", lambda i: db.addReward(dummyUtxo(i)), num_of_ops)
+        timeOps("getReward", lambda i: db.getReward(f"{i:064x}", i % 3), num_of_ops)
+        timeOps("addRawTx", lambda i: db.addRawTx(f"{i:064x}", os.urandom(250)), num_of_ops)
+        timeOps("getRawTx", lambda i: db.getRawTx(f"{i:064x}"), num_of_ops)
+        timeOps("getRewardsList", lambda i: db.getRewardsList("mn1"), max(1, num_of_ops // 100))
+        db.close()
+
+
+if __name__ == '__main__':
+    num_of_ops = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    bench(LegacyDatabase, num_of_ops)
+    bench(Database, num_of_ops)
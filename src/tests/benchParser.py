@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+"""
+Per-transaction latency of ParseTx (over the raw txes of test_transaction.data.json).
+Compares the BytesParser (raw bytes, struct) against the previous HexParser (hex string slicing),
+and the UTXO classification (cold staking / coinstake) with two full parses against the lazy TxView.
+Then the previous per-script classification (GetScriptType and hash extraction) against the batch ClassifyScripts.
+Run from the src directory:  python tests/benchParser.py [num_of_rounds]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pivx_parser import ParseTx, ReadTx, TxView, IsCoinStake, ClassifyScripts  # noqa: E402
+import utils  # noqa: E402
+
+
+class HexParser():
+    """
+    Frozen copy of the previous parser of pivx_parser (hex string slicing), for comparison
+    """
+    def __init__(self, hex_str):
+        self.cursor = 0
+        self.hex_str = hex_str
+
+    def readInt(self, nbytes, byteorder="big", signed=False):
+        if self.cursor + nbytes * 2 > len(self.hex_str):
+            raise Exception("HexParser range error")
+        b = bytes.fromhex(self.hex_str[self.cursor:self.cursor + nbytes * 2])
+        res = int.from_bytes(b, byteorder=byteorder, signed=signed)
+        self.cursor += nbytes * 2
+        return res
+
+    def readVarInt(self):
+        r = self.readInt(1)
+        if r == 253:
+            return self.readInt(2, "little")
+        elif r == 254:
+            return self.readInt(4, "little")
+        elif r == 255:
+            return self.readInt(8, "little")
+        return r
+
+    def readString(self, nbytes, byteorder="big"):
+        if self.cursor + nbytes * 2 > len(self.hex_str):
+            raise Exception("HexParser range error")
+        res = self.hex_str[self.cursor:self.cursor + nbytes * 2]
+        self.cursor += nbytes * 2
+        if byteorder == "little":
+            splits = [res[i:i + 2] for i in range(0, len(res), 2)]
+            return ''.join(splits[::-1])
+        return res
+
+    def readBytes(self, nbytes):
+        return bytes.fromhex(self.readString(nbytes))
+
+
+def timeParse(label, fun, rawtxes, num_of_rounds):
+    start = time.perf_counter()
+    for _ in range(num_of_rounds):
+        for rawtx in rawtxes:
+            fun(rawtx)
+    elapsed = time.perf_counter() - start
+    num_of_ops = num_of_rounds * len(rawtxes)
+    print(f"{label:<28} {num_of_ops:>6} txes {1e6 * elapsed / num_of_ops:>10.1f} us/tx")
+
+
+def classifyFullParse(rawtx):
+    # previous IsPayToColdStaking + GetDelegatedStaker: two full parses
+    tx = ParseTx(rawtx)
+    script = bytes.fromhex(tx['vout'][0]["scriptPubKey"]["hex"])
+    utils.IsPayToColdStaking(script), IsCoinStake(tx)
+    ParseTx(rawtx)
+
+
+def classifyTxView(rawtx):
+    tx = TxView(rawtx)
+    tx.isCoinStake(), tx.getDelegatedStaker(0)
+
+
+def getScriptType(script):
+    """
+    Frozen copy of the previous GetScriptType of pivx_parser (single script checks), for comparison
+    """
+    if len(script) == 0:
+        return "empty"
+    if utils.IsPayToColdStaking(script):
+        return "p2cs"
+    if (len(script) == 25 and script[0:3] == utils.OP_DUP + utils.OP_HASH160 + b'\x14' and
+            script[23:25] == utils.OP_EQUALVERIFY + utils.OP_CHECKSIG):
+        return "p2pkh"
+    if len(script) in [35, 67] and script[0] == len(script) - 2 and script[-1:] == utils.OP_CHECKSIG:
+        return "p2pk"
+    if len(script) == 23 and script[0:2] == utils.OP_HASH160 + b'\x14' and script[22:23] == utils.OP_EQUAL:
+        return "p2sh"
+    if script[0:1] == utils.OP_RETURN:
+        return "nulldata"
+    return "nonstandard"
+
+
+def classifyScript(script):
+    script_type = getScriptType(script)
+    if script_type == "p2sh":
+        return script_type, script[2:22]
+    if script_type in ["p2pkh", "p2pk", "p2cs"]:
+        return script_type, utils.extract_pkh_from_locking_script(script)
+    return script_type, None
+
+
+def timeClassify(label, fun, scripts, num_of_rounds):
+    start = time.perf_counter()
+    for _ in range(num_of_rounds):
+        fun(scripts)
+    elapsed = time.perf_counter() - start
+    num_of_ops = num_of_rounds * len(scripts)
+    print(f"{label:<28} {num_of_ops:>6} scripts {1e6 * elapsed / num_of_ops:>7.2f} us/script")
+
+
+if __name__ == '__main__':
+    num_of_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_transaction.data.json')
+    with open(data_file, encoding="utf-8") as f:
+        hex_txes = list(json.load(f)['raw_transactions'].values())
+    raw_txes = [bytes.fromhex(tx) for tx in hex_txes]
+    print(f"{len(hex_txes)} txes - avg size {sum(len(tx) for tx in raw_txes) // len(raw_txes)} bytes")
+    timeParse("HexParser (hex)", lambda tx: ReadTx(HexParser(tx)), hex_txes, num_of_rounds)
+    timeParse("BytesParser (hex)", ParseTx, hex_txes, num_of_rounds)
+    timeParse("BytesParser (bytes)", ParseTx, raw_txes, num_of_rounds)
+    timeParse("classify: 2 x ParseTx", classifyFullParse, raw_txes, num_of_rounds)
+    timeParse("classify: TxView", classifyTxView, raw_txes, num_of_rounds)
+    # scripts of a large wallet: P2PKH, P2CS and P2SH outputs
+    scripts = [bytes.fromhex("76a914" + "%040x" % i + "88ac") for i in range(3000)]
+    scripts += [bytes.fromhex("76a97b63d114" + "11" * 20 + "6714" + "%040x" % i + "6888ac") for i in range(3000)]
+    scripts += [bytes.fromhex("a914" + "%040x" % i + "87") for i in range(1000)]
+    num_of_rounds = max(1, num_of_rounds // 100)
+    timeClassify("classify: single scripts", lambda s: [classifyScript(x) for x in s], scripts, num_of_rounds)
+    timeClassify("classify: ClassifyScripts", ClassifyScripts, scripts, num_of_rounds)
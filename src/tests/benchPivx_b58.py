@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+"""
+Per-call latency of the base58 codec on address payloads (25 bytes) and WIF keys (38 bytes).
+Compares b58encode / b58decode against the previous implementation (powers of the base
+summed in a loop, characters prepended), and the batch b58check_many against single calls
+(distinct payloads, and the repeated staker payloads of a cold staking wallet).
+Run from the src directory:  python tests/benchPivx_b58.py [num_of_rounds]
+"""
+import os
+import sys
+import time
+from random import randbytes
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pivx_b58 import b58chars, b58encode, b58decode, b58check, b58check_many  # noqa: E402
+
+
+def b58encodeLoop(v):
+    # previous b58encode
+    long_value = 0
+    for (i, c) in enumerate(v[::-1]):
+        long_value += (256 ** i) * c
+    result = ''
+    while long_value >= 58:
+        div, mod = divmod(long_value, 58)
+        result = b58chars[mod] + result
+        long_value = div
+    result = b58chars[long_value] + result
+    nPad = 0
+    for c in v:
+        if c == 0:
+            nPad += 1
+        else:
+            break
+    return (b58chars[0] * nPad) + result
+
+
+def b58decodeLoop(v):
+    # previous b58decode
+    long_value = 0
+    for (i, c) in enumerate(v[::-1]):
+        long_value += b58chars.find(c) * (58 ** i)
+    result = bytes()
+    while long_value >= 256:
+        div, mod = divmod(long_value, 256)
+        result = bytes([mod]) + result
+        long_value = div
+    result = bytes([long_value]) + result
+    nPad = 0
+    for c in v:
+        if c == b58chars[0]:
+            nPad += 1
+        else:
+            break
+    return bytes([0]) * nPad + result
+
+
+def timeCodec(label, fun, values, num_of_rounds, batch=False):
+    start = time.perf_counter()
+    for _ in range(num_of_rounds):
+        if batch:
+            fun(values)
+        else:
+            for v in values:
+                fun(v)
+    elapsed = time.perf_counter() - start
+    num_of_ops = num_of_rounds * len(values)
+    print(f"{label:<28} {num_of_ops:>7} ops {1e6 * elapsed / num_of_ops:>8.2f} us/op")
+
+
+if __name__ == '__main__':
+    num_of_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    for size in [25, 38]:
+        payloads = [randbytes(size) for _ in range(1000)]
+        encoded = [b58encode(v) for v in payloads]
+        print(f"{size} bytes")
+        timeCodec("  encode: loop", b58encodeLoop, payloads, num_of_rounds)
+        timeCodec("  encode: b58encode", b58encode, payloads, num_of_rounds)
+        timeCodec("  decode: loop", b58decodeLoop, encoded, num_of_rounds)
+        timeCodec("  decode: b58decode", b58decode, encoded, num_of_rounds)
+    payloads = [randbytes(21) for _ in range(1000)]
+    print("21 bytes + checksum")
+    timeCodec("  b58check", b58check, payloads, num_of_rounds)
+    timeCodec("  b58check_many", b58check_many, payloads, num_of_rounds, batch=True)
+    payloads = [randbytes(21) for _ in range(10)] * 100
+    print("21 bytes + checksum, 10 distinct payloads")
+    timeCodec("  b58check", b58check, payloads, num_of_rounds)
+    timeCodec("  b58check_many", b58check_many, payloads, num_of_rounds, batch=True)
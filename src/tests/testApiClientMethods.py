@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import gzip
+import hashlib
+import json
+import threading
+import time
+import unittest
+from urllib.parse import urlsplit, parse_qs
+from apiClient import ApiClient, ExplorerBackend, fetch_all
+from apiSession import apiSession
+from blockbookClient import BlockBookClient
+from cryptoIDClient import CryptoIDClient
+
+
+class DummyExplorerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        time.sleep(self.server.delay)
+        if self.server.fail:
+            self.send_error(500)
+            return
+        if self.path.startswith('/pivx/api.dws'):
+            self.answerCryptoID(parse_qs(urlsplit(self.path).query))
+            return
+        method, param = self.path.split('/')[2:4]
+        if method == 'address':
+            response = {'address': param, 'balance': "1000"}
+        elif method == 'utxo':
+            response = [{'txid': "aa" * 32, 'vout': 0, 'satoshis': 1000, 'confirmations': 10}]
+        else:
+            self.send_error(404)
+            return
+        self.sendJson(response)
+
+    def answerCryptoID(self, query):
+        self.server.keys.append(query['key'][0])
+        if self.server.throttle > 0:
+            self.server.throttle -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if query['q'][0] == 'getbalance':
+            self.sendJson(1000.0)
+        else:
+            self.send_error(404)
+
+    def sendJson(self, response):
+        data = json.dumps(response).encode()
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            data = gzip.compress(data)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def startDummyExplorer():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DummyExplorerHandler)
+    server.paths = []
+    server.delay = 0
+    server.fail = False
+    server.throttle = 0
+    server.keys = []
+    server.not_modified = 0
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server
+
+
+class TestApiClientMethods(unittest.TestCase):
+    def setUp(self):
+        self.server = startDummyExplorer()
+        self.client = BlockBookClient()
+        self.client.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_sessionReuse(self):
+        for _ in range(3):
+            self.assertEqual(self.client.getBalance("DAddr"), "1000")
+        self.assertEqual(self.client.getAddressUtxos("DAddr")[0]['script'], "")
+        self.assertEqual(self.server.paths, ["/api/address/DAddr"] * 3 + ["/api/utxo/DAddr"])
+        # single (keep-alive) connection
+        host = f"127.0.0.1:{self.server.server_port}"
+        self.assertEqual(apiSession.getStats()[host], {'requests': 4, 'connections': 1})
+
+    def test_fetchAll(self):
+        attempts = {}
+
+        def fetch(key):
+            attempts[key] = attempts.get(key, 0) + 1
+            # key 1 fails once, key 2 always
+            if key == 2 or (key == 1 and attempts[key] == 1):
+                return None
+            return key * 10
+
+        results, failed = fetch_all(fetch, [0, 1, 2, 3, 1], workers=4, retries=2, retry_delay=0.01)
+        self.assertEqual(results, {0: 0, 1: 10, 3: 30})
+        self.assertEqual(failed, [2])
+        self.assertEqual(attempts, {0: 1, 1: 2, 2: 3, 3: 1})
+
+    def test_concurrentUtxos(self):
+        client = ApiClient(isTestnet=True)
+        client.backends = [ExplorerBackend("dummy", self.client)]
+        self.server.delay = 0.2
+        addresses = [f"DAddr{i}" for i in range(5)]
+        start = time.time()
+        results, failed = client.getAddressesUtxos(addresses, workers=5)
+        # about the time of a single request
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEqual(sorted(results), addresses)
+        self.assertEqual(failed, [])
+
+    def test_backendRotation(self):
+        backup_server = startDummyExplorer()
+        client = ApiClient(isTestnet=True)
+        primary = ExplorerBackend("primary", BlockBookClient(True, self.client.url))
+        backup = ExplorerBackend("backup", BlockBookClient(True, f"http://127.0.0.1:{backup_server.server_port}"))
+        client.backends = [primary, backup]
+        # failover
+        self.server.fail = True
+        self.assertEqual(client.getBalance("DAddr"), "1000")
+        self.assertIs(client.selected, backup)
+        self.assertEqual(primary.failures, 1)
+        self.assertGreater(primary.retry_time, time.time())
+        # failed backend skipped while backing off
+        client.invalidateCache()
+        self.assertEqual(client.getBalance("DAddr"), "1000")
+        self.assertEqual(len(self.server.paths), 1)
+        # probed after the backoff: back to the primary when recovered
+        self.server.fail = False
+        primary.retry_time = 0
+        client.invalidateCache()
+        self.assertEqual(client.getBackends()[0], primary)
+        self.assertEqual(client.getBalance("DAddr"), "1000")
+        self.assertIs(client.selected, primary)
+        self.assertEqual(client.getStats()["primary"]['failures'], 0)
+        backup_server.shutdown()
+        backup_server.server_close()
+
+    def test_concurrentStats(self):
+        backend = ExplorerBackend("dummy", self.client)
+
+        def update(ok):
+            for _ in range(2000):
+                backend.updateStats(ok, 0.1, time.time())
+
+        threads = [threading.Thread(target=update, args=(False,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # no failure lost
+        self.assertEqual(backend.stats()['failures'], 16000)
+        self.assertLess(backend.stats()['success_rate'], 0.001)
+        backend.updateStats(True, 0.1, time.time())
+        self.assertEqual(backend.stats(), {'success_rate': 1.0, 'latency': 0.1, 'failures': 0})
+
+    def test_responseCache(self):
+        client = ApiClient(isTestnet=True)
+        client.backends = [ExplorerBackend("dummy", self.client)]
+        client.setTipHeight(1000)
+        utxos = client.getAddressUtxos("DAddr")
+        utxos[0]['mn_name'] = "mn1"
+        # cached (copy of the response)
+        self.assertNotIn('mn_name', client.getAddressUtxos("DAddr")[0])
+        self.assertEqual(len(self.server.paths), 1)
+        # new block: conditional request, not modified
+        client.setTipHeight(1001)
+        del utxos[0]['mn_name']
+        self.assertEqual(client.getAddressUtxos("DAddr"), utxos)
+        self.assertEqual((len(self.server.paths), self.server.not_modified), (2, 1))
+        # own transaction
+        client.invalidateCache()
+        client.getAddressUtxos("DAddr")
+        self.assertEqual(len(self.server.paths), 3)
+        # expired
+        client.cache.ttl = 0
+        client.getAddressUtxos("DAddr")
+        self.assertEqual(len(self.server.paths), 4)
+        self.assertEqual(client.getCacheStats(), {'entries': 1, 'hits': 1, 'misses': 4})
+
+    def test_cryptoIDThrottling(self):
+        client = CryptoIDClient()
+        client.url = f"http://127.0.0.1:{self.server.server_port}/pivx/api.dws"
+        self.server.throttle = 1
+        start = time.time()
+        self.assertEqual(client.getBalance("DAddr"), 1000.0)
+        # throttled key paused, request sent again with another key
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(len(self.server.keys), 2)
+        self.assertNotEqual(self.server.keys[0], self.server.keys[1])
+
+    if __name__ == '__main__':
+        unittest.main(verbosity=2)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+import gc
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from database import Database, DB_QUERIES, SCHEMA_MIGRATIONS, SQL_SELECT_MN_REWARDS, SQL_DELETE_OLD_RAWTXES, \
+    SQL_SELECT_PROPOSAL_VOTES, SQL_SELECT_REWARD
+from proposals import Proposal
+
+
+class DummySignal():
+    def emit(self):
+        pass
+
+
+class DummyApp():
+    sig_changed_rpcServers = DummySignal()
+
+
+def dummyUtxo(i, mn_name="mn1"):
+    utxo = {}
+    utxo['txid'] = f"{i:064x}"
+    utxo['vout'] = i % 3
+    utxo['satoshis'] = 1000 * i
+    utxo['confirmations'] = i
+    utxo['script'] = ""
+    utxo['mn_name'] = mn_name
+    utxo['coinstake'] = (i % 2 == 0)
+    utxo['staker'] = ""
+    return utxo
+
+
+class TestDatabaseMethods(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.db = Database(DummyApp(), os.path.join(self.tmpDir.name, 'test.db'))
+        self.db.openDB()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpDir.cleanup()
+
+    def test_walMode(self):
+        cursor = self.db.getCursor()
+        cursor.execute("PRAGMA journal_mode")
+        mode = cursor.fetchone()[0]
+        self.db.releaseCursor()
+        self.assertEqual(mode.upper(), "WAL")
+
+    def test_connectionReuse(self):
+        # same thread: same connection
+        conn = self.db.getConnection()
+        self.db.addReward(dummyUtxo(1))
+        self.assertIs(self.db.getConnection(), conn)
+        # other thread: different connection
+        other = []
+        t = threading.Thread(target=lambda: other.append(self.db.getConnection()))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], conn)
+        # which is dropped from the pool with its thread
+        other.clear()
+        gc.collect()
+        self.assertEqual(len(self.db.connections), 1)
+
+    def test_addGetReward(self):
+        for i in range(10):
+            self.db.addReward(dummyUtxo(i, "mn1" if i < 6 else "mn2"))
+        self.assertEqual(len(self.db.getRewardsList()), 10)
+        self.assertEqual(len(self.db.getRewardsList("mn2")), 4)
+        utxo = dummyUtxo(3)
+        self.assertEqual(self.db.getReward(utxo['txid'], utxo['vout']), utxo)
+
+    def test_bulkInserts(self):
+        utxos = [dummyUtxo(i) for i in range(100)]
+        self.db.addRewards(utxos)
+        self.assertEqual(self.db.getRewardsList("mn1"), utxos)
+        rawtxes = {f"{i:064x}": os.urandom(i) for i in range(1, 50)}
+        self.db.addRawTxes(rawtxes, 1)
+        self.assertEqual(self.db.getRawTx(f"{7:064x}")['rawtx'], rawtxes[f"{7:064x}"])
+        proposals = [Proposal(f"prop{i}", "http://test.org", f"{i:064x}", f"{i:064x}", 0, 43200, 1, 1,
+                              "DUB5aKbCiTkyHX1P5dh4J9mtFqWDJPGDVn", i, 0, 0, 10.0, 10.0) for i in range(20)]
+        self.db.addProposals(proposals)
+        self.assertEqual([p.Hash for p in self.db.getProposalsList()], [p.Hash for p in proposals])
+
+    def test_syncRewards(self):
+        utxos = [dummyUtxo(i) for i in range(10)]
+        self.db.addRewards(utxos)
+        # one spent, one new, one with more confirmations
+        removed = [(utxos[0]['txid'], utxos[0]['vout'])]
+        added = [dummyUtxo(10)]
+        updated = [dict(utxos[5], confirmations=500)]
+        self.db.syncRewards(added, removed, updated)
+        rewards = {r['txid']: r for r in self.db.getRewardsList()}
+        self.assertEqual(len(rewards), 10)
+        self.assertNotIn(utxos[0]['txid'], rewards)
+        self.assertIn(added[0]['txid'], rewards)
+        self.assertEqual(rewards[utxos[5]['txid']]['confirmations'], 500)
+
+    def test_schemaVersion(self):
+        cursor = self.db.getCursor()
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        self.db.releaseCursor()
+        self.assertEqual(version, len(SCHEMA_MIGRATIONS))
+        # migrations are not applied twice
+        self.db.close()
+        self.db.openDB()
+        self.assertEqual(len(self.db.getRewardsList()), 0)
+
+    def test_queryPlans(self):
+        plans = self.db.printQueryPlans()
+        self.assertEqual(len(plans), len(DB_QUERIES))
+        self.assertIn("idx_rewards_mn_name", plans[SQL_SELECT_MN_REWARDS][0])
+        self.assertIn("idx_rawtxes_lastfetch", plans[SQL_DELETE_OLD_RAWTXES][0])
+        self.assertIn("idx_my_votes_p_hash", plans[SQL_SELECT_PROPOSAL_VOTES][0])
+        # outpoint lookups use the primary key
+        self.assertIn("INDEX", plans[SQL_SELECT_REWARD][0])
+
+    def test_rawTxBlob(self):
+        # compressible tx is stored compressed, random one as is
+        rawtxes = {"aa": bytes(1000), "bb": os.urandom(250)}
+        for txid in rawtxes:
+            self.db.addRawTx(txid, rawtxes[txid])
+            self.assertEqual(self.db.getRawTx(txid)['rawtx'], rawtxes[txid])
+        cursor = self.db.getCursor()
+        cursor.execute("SELECT tx_hash, length(rawtx), compressed FROM RAWTXES ORDER BY tx_hash")
+        rows = cursor.fetchall()
+        self.db.releaseCursor()
+        self.assertLess(rows[0][1], 1000)
+        self.assertEqual(rows[0][2], 1)
+        self.assertEqual(rows[1][1:], (250, 0))
+
+    def test_rawTxMigration(self):
+        # database with hex TEXT raw txes (schema version 1)
+        self.db.close()
+        file_name = os.path.join(self.tmpDir.name, 'old.db')
+        conn = sqlite3.connect(file_name)
+        conn.execute("CREATE TABLE RAWTXES(tx_hash TEXT PRIMARY KEY,  rawtx TEXT, lastfetch INTEGER)")
+        conn.execute("INSERT INTO RAWTXES VALUES (?, ?, ?)", ("aa", "0100ff" * 100, 5))
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        conn.close()
+        self.db = Database(DummyApp(), file_name)
+        self.db.openDB()
+        self.assertEqual(self.db.getRawTx("aa")['rawtx'], bytes.fromhex("0100ff" * 100))
+        self.assertIn("idx_rawtxes_lastfetch", self.db.printQueryPlans()["DELETE FROM RAWTXES WHERE lastfetch < ?"][0])
+
+    def test_pruneRawTxes(self):
+        utxos = [dummyUtxo(i) for i in range(10)]
+        self.db.addRewards(utxos[:5])
+        for i, utxo in enumerate(utxos):
+            self.db.addRawTx(utxo['txid'], os.urandom(100), i)
+        # unreferenced txes removed (in batches)
+        self.assertEqual(self.db.clearUnreferencedRawTxes(batch_size=2), 5)
+        self.assertIsNone(self.db.getRawTx(utxos[7]['txid']))
+        # hit on the oldest tx moves it to the end of the LRU order
+        self.db.getRawTx(utxos[0]['txid'], 100)
+        self.assertEqual(self.db.evictRawTxes(max_bytes=250, batch_size=1), 3)
+        remaining = [utxo['txid'] for utxo in utxos[:5] if self.db.getRawTx(utxo['txid']) is not None]
+        self.assertEqual(remaining, [utxos[0]['txid'], utxos[4]['txid']])
+        # nothing to do below the budget
+        self.assertEqual(self.db.evictRawTxes(max_bytes=250), 0)
+
+    def test_mnListSnapshots(self):
+        mns = [{'txhash': f"{i:064x}", 'outidx': 0, 'addr': f"addr{i}", 'status': 'ENABLED',
+                'lastseen': 1000, 'activetime': 100} for i in range(5)]
+        self.assertEqual(self.db.saveMnListSnapshot(100, mns, 1000), 5)
+        # volatile fields are not a change
+        for mn in mns:
+            mn['lastseen'] += 60
+            mn['lastpaid'] = 1050
+        self.assertEqual(self.db.saveMnListSnapshot(101, mns, 1060), 0)
+        # one changed status, one removed, one added
+        mns[1]['status'] = 'EXPIRED'
+        mns.pop(2)
+        mns.append(dict(mns[0], txhash=f"{9:064x}"))
+        self.assertEqual(self.db.saveMnListSnapshot(105, mns, 1300), 3)
+        # older snapshots are not saved
+        self.assertIsNone(self.db.saveMnListSnapshot(104, mns, 1300))
+        # rebuilt lists
+        self.assertEqual(len(self.db.getMnListSnapshot()), 5)
+        old_list = self.db.getMnListSnapshot(104)
+        self.assertEqual(sorted(old_list), [(f"{i:064x}", 0) for i in range(5)])
+        self.assertEqual(old_list[(f"{1:064x}", 0)]['status'], 'ENABLED')
+        self.assertNotIn('lastseen', old_list[(f"{1:064x}", 0)])
+        # status history
+        self.assertEqual(self.db.getMnStatusChange(f"{1:064x}", 0), {'height': 105, 'time': 1300, 'status': 'EXPIRED'})
+        self.assertEqual(self.db.getMnStatusChange(f"{0:064x}", 0), {'height': 100, 'time': 1000, 'status': 'ENABLED'})
+        self.assertEqual(self.db.getMnStatusChange(f"{2:064x}", 0)['status'], None)
+        self.assertIsNone(self.db.getMnStatusChange(f"{7:064x}", 0))
+
+    def test_mnListRetention(self):
+        mns = [{'txhash': f"{i:064x}", 'outidx': 0, 'status': 'ENABLED'} for i in range(3)]
+        self.db.saveMnListSnapshot(100, mns, 1000, keep=2)
+        mns[0]['status'] = 'EXPIRED'
+        self.db.saveMnListSnapshot(101, mns, 1060, keep=2)
+        mns[0]['status'] = 'ENABLED'
+        mns.pop(1)
+        self.db.saveMnListSnapshot(102, mns, 1120, keep=2)
+        mns[1]['status'] = 'EXPIRED'
+        self.assertEqual(self.db.saveMnListSnapshot(103, mns, 1180, keep=2), 1)
+        self.assertEqual(self.db.saveMnListSnapshot(104, mns, 1240, keep=2), 0)
+        cursor = self.db.getCursor()
+        cursor.execute("SELECT height FROM MN_LIST_SNAPSHOTS ORDER BY height")
+        snapshots = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT COUNT(*) FROM MN_LIST_DELTAS")
+        num_of_deltas = cursor.fetchone()[0]
+        self.db.releaseCursor()
+        # last two snapshots, plus the older ones of the compacted deltas
+        self.assertEqual(snapshots, [100, 102, 103, 104])
+        # compacted: last delta of each entry before the cutoff, removed entry dropped
+        self.assertEqual(num_of_deltas, 3)
+        # kept snapshots rebuilt as before
+        self.assertEqual(sorted(self.db.getMnListSnapshot(103)), [(f"{0:064x}", 0), (f"{2:064x}", 0)])
+        self.assertEqual(self.db.getMnListSnapshot(103)[(f"{2:064x}", 0)]['status'], 'EXPIRED')
+        self.assertEqual(self.db.getMnStatusChange(f"{2:064x}", 0), {'height': 103, 'time': 1180, 'status': 'EXPIRED'})
+        self.assertEqual(self.db.getMnStatusChange(f"{0:064x}", 0)['time'], 1120)
+
+    def test_mnListSameHeight(self):
+        mns = [{'txhash': f"{i:064x}", 'outidx': 0, 'status': 'ENABLED'} for i in range(3)]
+        self.db.saveMnListSnapshot(100, mns, 1000)
+        mns[0]['status'] = 'EXPIRED'
+        self.assertEqual(self.db.saveMnListSnapshot(101, mns, 1060), 1)
+        # saved again at the same height: deltas merged, first time kept
+        mns[1]['status'] = 'EXPIRED'
+        self.assertEqual(self.db.saveMnListSnapshot(101, mns, 1070), 1)
+        cursor = self.db.getCursor()
+        cursor.execute("SELECT time, changes FROM MN_LIST_SNAPSHOTS WHERE height = 101")
+        self.assertEqual(cursor.fetchone(), (1060, 2))
+        self.db.releaseCursor()
+        self.assertEqual(self.db.getMnStatusChange(f"{0:064x}", 0), {'height': 101, 'time': 1060, 'status': 'EXPIRED'})
+        self.assertEqual(self.db.getMnStatusChange(f"{1:064x}", 0), {'height': 101, 'time': 1060, 'status': 'EXPIRED'})
+
+    def test_mnListCompactedStatusChange(self):
+        mns = [{'txhash': f"{0:064x}", 'outidx': 0, 'addr': "addr0", 'status': 'ENABLED'}]
+        self.db.saveMnListSnapshot(100, mns, 1000, keep=2)
+        self.assertEqual(self.db.getMnStatusChange(f"{0:064x}", 0)['height'], 100)
+        # other field changed, same status
+        mns[0]['addr'] = "addr1"
+        self.db.saveMnListSnapshot(101, mns, 1060, keep=2)
+        self.assertEqual(self.db.getMnStatusChange(f"{0:064x}", 0)['height'], 100)
+        self.db.saveMnListSnapshot(102, mns, 1120, keep=2)
+        self.db.saveMnListSnapshot(103, mns, 1180, keep=2)
+        # the delta at 100 is compacted: status change reported at the oldest delta kept
+        self.assertEqual(self.db.getMnStatusChange(f"{0:064x}", 0), {'height': 101, 'time': 1060, 'status': 'ENABLED'})
+
+    def test_outputsMeta(self):
+        utxos = [dummyUtxo(i) for i in range(6)]
+        self.db.addRewards(utxos[:3])
+        meta = {(u['txid'], u['vout']): {'script_type': "p2pkh", 'staker': "", 'coinstake': u['coinstake'],
+                                         'satoshis': u['satoshis']} for u in utxos}
+        self.db.addOutputsMeta(meta)
+        outpoints = [(u['txid'], u['vout']) for u in utxos] + [("ff" * 32, 0), (utxos[0]['txid'], 5)]
+        self.assertEqual(self.db.getOutputsMeta(outpoints), meta)
+        # spent outputs removed
+        self.assertEqual(self.db.clearUnreferencedOutputsMeta(), 3)
+        self.assertEqual(len(self.db.getOutputsMeta(outpoints)), 3)
+
+    def test_reopen(self):
+        self.db.addReward(dummyUtxo(1))
+        self.db.close()
+        self.db.openDB()
+        self.assertEqual(len(self.db.getRewardsList()), 1)
+
+    if __name__ == '__main__':
+        unittest.main(verbosity=2)
@@ -5,7 +5,7 @@
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
 import unittest
-from pivx_b58 import b58chars, b58encode, b58decode
+from pivx_b58 import b58chars, b58encode, b58decode, b58check, b58encode_many, b58check_many, b58decode_many
 from random import randint
 
 
@@ -31,17 +31,44 @@ class TestPivx_b58Methods(unittest.TestCase):
         # verify
         self.assertEqual(b58encode(decoded_text), text)
 
+    def test_leadingZeros(self):
+        self.assertEqual(b58encode(b""), "")
+        self.assertEqual(b58encode(b"\0\0" + b"\xff"), "115Q")
+        self.assertEqual(b58decode("115Q"), b"\0\0\xff")
+        self.assertEqual(b58decode("111"), b"\0\0\0")
+        self.assertIsNone(b58decode("115Q", 4))
+        with self.assertRaises(ValueError):
+            b58decode("0OIl")
+
+    def test_batch(self):
+        texts = [self.randomBytesString(21) for _ in range(100)]
+        encoded_texts = b58encode_many(texts)
+        self.assertEqual(encoded_texts, [b58encode(text) for text in texts])
+        self.assertEqual(b58decode_many(encoded_texts), texts)
+        # with checksum (mainnet P2PKH address of a known pubkey hash)
+        pkh = bytes.fromhex("1e") + bytes.fromhex("55d0e1a0a1b4c2e82a08a7c3f4b6ea1c2d43ad5e")
+        self.assertEqual(b58check_many([pkh] * 2), [b58check(pkh)] * 2)
+        # repeated and mutable values
+        values = [texts[0], bytearray(texts[1]), texts[0], texts[1]]
+        self.assertEqual(b58encode_many(values), [b58encode(bytes(v)) for v in values])
+        self.assertEqual(b58check_many(values), [b58check(bytes(v)) for v in values])
+        self.assertEqual(b58decode_many(encoded_texts[:2] * 2, 21), texts[:2] * 2)
+        self.assertEqual(b58decode_many(encoded_texts[:1], 20), [None])
+        self.assertEqual(b58check_many([]), [])
+        self.assertEqual(b58decode(b58check(pkh))[:-4], pkh)
+        self.assertTrue(b58check(pkh).startswith("D"))
+
     def randomBytesString(self, length):
         randomString = bytes()
         for _ in range(length):
-            randomString += bytes([randint(0, 256)])
+            randomString += bytes([randint(0, 255)])
 
         return randomString
 
     def randomB58String(self, length):
         randomString = ''
         for _ in range(length):
-            randomString += b58chars[randint(0, len(b58chars))]
+            randomString += b58chars[randint(0, len(b58chars) - 1)]
 
         return randomString
 
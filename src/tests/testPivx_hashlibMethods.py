@@ -5,7 +5,7 @@
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
 import unittest
-from pivx_hashlib import generate_privkey, pubkey_to_address
+from pivx_hashlib import generate_privkey, pubkey_to_address, pubkeyhash_to_address, pubkeyhashes_to_addresses
 import bitcoin
 from pivx_b58 import b58decode
 
@@ -36,5 +36,13 @@ class TestPivx_hashlibMethods(unittest.TestCase):
         randomPivxAddr_bin_check = bitcoin.bin_dbl_sha256(randomPivxAddr_bin[0:-4])[0:4]
         self.assertEqual(randomPivxAddr_bin[-4:], randomPivxAddr_bin_check)
 
+    def test_pubkeyhashes_to_addresses(self):
+        pkey_hashes = [bitcoin.bin_hash160(bytes([i]) * 33) for i in range(3)] * 2
+        for isTestnet in [False, True]:
+            for isCold in [False, True]:
+                self.assertEqual(pubkeyhashes_to_addresses(pkey_hashes, isTestnet, isCold),
+                                 [pubkeyhash_to_address(h, isTestnet, isCold) for h in pkey_hashes])
+        self.assertEqual(pubkeyhashes_to_addresses([]), [])
+
     if __name__ == '__main__':
         unittest.main(verbosity=2)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+import json
+import os
+import unittest
+from bitcoin import bin_hash160
+from pivx_parser import BytesParser, ParseTx, TxView, GetScriptType, ClassifyScripts, GetOutputsMeta
+
+
+class TestPivx_parserMethods(unittest.TestCase):
+    def setUp(self):
+        data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_transaction.data.json')
+        with open(data_file, encoding="utf-8") as f:
+            self.rawtxes = json.load(f)['raw_transactions']
+
+    def test_readers(self):
+        data = "fd0301" + "0100000000000000" + "aabbcc" + "ffffffff"
+        p = BytesParser(bytes.fromhex(data))
+        self.assertEqual(p.readVarInt(), 259)
+        self.assertEqual(p.readInt(8, "little"), 1)
+        self.assertEqual(p.readString(3, "little"), "ccbbaa")
+        self.assertEqual(p.readInt(4, "big", signed=True), -1)
+        with self.assertRaises(Exception):
+            p.readInt(1)
+
+    def test_parseTx(self):
+        for rawtx in self.rawtxes.values():
+            tx = ParseTx(rawtx)
+            # same output from hex or bytes
+            self.assertEqual(tx, ParseTx(bytes.fromhex(rawtx)))
+            self.assertEqual(tx['version'], 1)
+            self.assertEqual(len(tx['vout'][0]['scriptPubKey']['addresses']), 1)
+
+    def test_txView(self):
+        for rawtx in self.rawtxes.values():
+            tx = ParseTx(rawtx)
+            view = TxView(bytes.fromhex(rawtx))
+            self.assertEqual((view.version, view.locktime), (tx['version'], tx['locktime']))
+            self.assertEqual(len(view.outputs), len(tx['vout']))
+            for n, vout in enumerate(tx['vout']):
+                self.assertEqual(view.getValue(n), vout['value'])
+                self.assertEqual(view.getScript(n).hex(), vout['scriptPubKey']['hex'])
+                self.assertEqual([view.getAddress(n)], vout['scriptPubKey']['addresses'])
+            self.assertFalse(view.isCoinStake())
+            self.assertFalse(view.isPayToColdStaking(0))
+            self.assertEqual(view.getDelegatedStaker(0), "")
+
+    def test_coldStaking(self):
+        # coinstake with a P2CS output
+        p2cs = bytes.fromhex("76a97b63d114" + "11" * 20 + "6714" + "22" * 20 + "6888ac")
+        rawtx = ("01000000" + "01" + "33" * 32 + "01000000" + "00" + "ffffffff" +
+                 "02" + "00" * 8 + "00" + (10 ** 8).to_bytes(8, "little").hex() + "33" + p2cs.hex() +
+                 "00000000")
+        view = TxView(rawtx)
+        self.assertTrue(view.isCoinStake())
+        self.assertTrue(view.isPayToColdStaking(1))
+        self.assertEqual(view.getValue(1), 10 ** 8)
+        self.assertFalse(view.isPayToColdStaking(0))
+        self.assertTrue(view.getDelegatedStaker(1).startswith("S"))
+        self.assertEqual(view.getAddress(1), ParseTx(rawtx)['vout'][1]['scriptPubKey']['addresses'][0])
+        meta = view.getOutputMeta(1)
+        self.assertEqual((meta['script_type'], meta['coinstake'], meta['satoshis']), ("p2cs", True, 10 ** 8))
+        self.assertEqual(meta['staker'], view.getDelegatedStaker(1))
+
+    def test_scriptType(self):
+        self.assertEqual(GetScriptType(b""), "empty")
+        self.assertEqual(GetScriptType(bytes.fromhex("76a914" + "11" * 20 + "88ac")), "p2pkh")
+        self.assertEqual(GetScriptType(bytes.fromhex("21" + "02" * 33 + "ac")), "p2pk")
+        self.assertEqual(GetScriptType(bytes.fromhex("6a0401020304")), "nulldata")
+        self.assertEqual(GetScriptType(bytes.fromhex("a914" + "11" * 20 + "87")), "p2sh")
+        self.assertEqual(GetScriptType(bytes.fromhex("51")), "nonstandard")
+
+    def test_classifyScripts(self):
+        p2pkh = bytes.fromhex("76a914" + "11" * 20 + "88ac")
+        p2sh = bytes.fromhex("a914" + "22" * 20 + "87")
+        p2pk = bytes.fromhex("21" + "02" * 33 + "ac")
+        p2cs = bytes.fromhex("76a97b63d114" + "33" * 20 + "6714" + "44" * 20 + "6888ac")
+        scripts = [p2pkh, p2sh, p2pk, p2cs, b"", bytes.fromhex("6a0401020304"),
+                   # right length, wrong opcodes
+                   p2pkh[:24] + b"\x87", bytes.fromhex("6a") + p2sh[1:], p2cs[:2] + b"\x00" + p2cs[3:]]
+        res = ClassifyScripts(scripts * 50)
+        self.assertEqual(len(res), len(scripts) * 50)
+        self.assertEqual(res[:len(scripts)], [("p2pkh", b"\x11" * 20, None), ("p2sh", b"\x22" * 20, None),
+                                              ("p2pk", bin_hash160(b"\x02" * 33), None),
+                                              ("p2cs", b"\x44" * 20, b"\x33" * 20),
+                                              ("empty", None, None), ("nulldata", None, None),
+                                              ("nonstandard", None, None), ("nulldata", None, None),
+                                              ("nonstandard", None, None)])
+        self.assertEqual(res, res[:len(scripts)] * 50)
+        # GetScriptType is the single script wrapper
+        self.assertEqual([GetScriptType(s) for s in scripts], [t for t, _, _ in res[:len(scripts)]])
+
+    def test_outputsMeta(self):
+        views = [TxView(rawtx) for rawtx in self.rawtxes.values()]
+        outputs = [(view, n) for view in views for n in range(len(view.outputs))]
+        metas = GetOutputsMeta(outputs)
+        self.assertEqual(len(metas), len(outputs))
+        for (view, n), meta in zip(outputs, metas):
+            self.assertEqual(meta, {'script_type': "p2pkh", 'staker': "", 'coinstake': False,
+                                    'satoshis': view.getValue(n)})
+            self.assertEqual(view.getOutputMeta(n), meta)
+        # P2CS output: staker address from the matched staker hash
+        p2cs = bytes.fromhex("76a97b63d114" + "11" * 20 + "6714" + "22" * 20 + "6888ac")
+        rawtx = ("01000000" + "01" + "33" * 32 + "01000000" + "00" + "ffffffff" +
+                 "02" + "00" * 8 + "00" + (10 ** 8).to_bytes(8, "little").hex() + "33" + p2cs.hex() +
+                 "00000000")
+        view = TxView(rawtx)
+        metas = GetOutputsMeta([(view, 0), (view, 1)], isTestnet=True)
+        self.assertEqual(metas[0]['script_type'], "empty")
+        self.assertEqual(metas[1], {'script_type': "p2cs", 'staker': view.getDelegatedStaker(1, isTestnet=True),
+                                    'coinstake': True, 'satoshis': 10 ** 8})
+        self.assertNotEqual(metas[1]['staker'], GetOutputsMeta([(view, 1)])[0]['staker'])
+
+    if __name__ == '__main__':
+        unittest.main(verbosity=2)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+import unittest
+from rateLimiter import TokenBucket, HostRateLimiter, KeyScheduler
+
+
+class TestRateLimiterMethods(unittest.TestCase):
+
+    def test_tokenBucket(self):
+        bucket = TokenBucket(rate=10, burst=3)
+        # burst allowed at once, then one request every 1/rate seconds
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+    def test_hostRateLimiter(self):
+        limiter = HostRateLimiter(rate=10, burst=1)
+        # one bucket for each host
+        self.assertIs(limiter.getBucket("https://host1.org/api/a"), limiter.getBucket("https://host1.org/api/b"))
+        self.assertIsNot(limiter.getBucket("https://host1.org"), limiter.getBucket("https://host2.org"))
+        self.assertEqual(limiter.acquire("https://host1.org"), 0)
+        self.assertEqual(limiter.acquire("https://host2.org"), 0)
+        self.assertGreater(limiter.acquire("https://host1.org"), 0.05)
+
+    def test_keyScheduler(self):
+        scheduler = KeyScheduler(["k1", "k2"], rate=10, burst=1)
+        # keys used in turn
+        keys = [scheduler.reserve() for _ in range(2)]
+        self.assertEqual(sorted(k for k, _ in keys), ["k1", "k2"])
+        self.assertEqual([w for _, w in keys], [0, 0])
+        # then the first one available again
+        self.assertAlmostEqual(scheduler.reserve()[1], 0.1, places=2)
+        # blocked key skipped
+        scheduler = KeyScheduler(["k1", "k2"], rate=10, burst=5)
+        scheduler.block("k1", 60)
+        self.assertEqual([scheduler.reserve()[0] for _ in range(3)], ["k2"] * 3)
+
+    if __name__ == '__main__':
+        unittest.main(verbosity=2)
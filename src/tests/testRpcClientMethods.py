@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+import unittest
+from bitcoinrpc.authproxy import JSONRPCException
+from rpcClient import RpcClient
+
+
+class DummyNodeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Known raw txes: txid -> rawtx
+    rawtxes = {"aa" * 32: "0100", "bb" * 32: "0200"}
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.num_of_connections += 1
+
+    def answer(self, request):
+        self.server.calls.append(request['method'])
+        res = {'id': request['id'], 'result': None, 'error': None}
+        if request['method'] == 'getblockcount':
+            res['result'] = self.server.height
+        elif request['method'] == 'getfeeinfo':
+            res['result'] = {'feeperkb': 0.0002}
+        elif request['method'] == 'sendrawtransaction':
+            res['result'] = "ff" * 32
+        elif request['method'] == 'getinfo':
+            res['result'] = {'testnet': True, 'protocolversion': 70920}
+        elif request['method'] == 'mnsync':
+            res['result'] = {'IsBlockchainSynced': True}
+        elif request['method'] == 'getbudgetinfo':
+            res['result'] = [{'Name': 'prop1', 'URL': 'http://test.org', 'Hash': "dd" * 32, 'FeeHash': "ee" * 32,
+                              'BlockStart': 43200, 'BlockEnd': 86400, 'TotalPaymentCount': 1,
+                              'RemainingPaymentCount': 1, 'PaymentAddress': 'yAddress', 'Yeas': 10,
+                              'Nays': 0, 'Abstains': 0, 'TotalPayment': 100.0, 'MonthlyPayment': 100.0}]
+        elif request['method'] == 'listmasternodes':
+            res['result'] = [{'txhash': f"{i:064x}", 'outidx': i % 2, 'addr': f"addr{i}",
+                              'status': 'ENABLED' if i % 3 else 'EXPIRED',
+                              'activetime': 1000 * i, 'lastpaid': 0} for i in range(10)]
+        elif request['method'] == 'getrawtransaction':
+            txid = request['params'][0]
+            if txid in self.rawtxes:
+                res['result'] = self.rawtxes[txid]
+            else:
+                res['error'] = {'code': -5, 'message': 'No such mempool or blockchain transaction'}
+        else:
+            res['error'] = {'code': -32601, 'message': 'Method not found'}
+        return res
+
+    def do_POST(self):
+        self.server.num_of_requests += 1
+        time.sleep(self.server.delay)
+        self.server.paths.append(self.path)
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if isinstance(request, list) and self.server.batch_error:
+            # single error object for the whole batch
+            response = {'id': None, 'result': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+        elif isinstance(request, list):
+            response = [self.answer(r) for r in request]
+        else:
+            response = self.answer(request)
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if self.server.drop_connection:
+            # close without notifying the client
+            self.server.drop_connection = False
+            self.close_connection = True
+
+
+def startDummyNode(height=1000, delay=0):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DummyNodeHandler)
+    server.calls = []
+    server.num_of_requests = 0
+    server.num_of_connections = 0
+    server.drop_connection = False
+    server.batch_error = False
+    server.paths = []
+    server.height = height
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server
+
+
+class TestRpcClientMethods(unittest.TestCase):
+    def setUp(self):
+        self.server = startDummyNode()
+        self.client = RpcClient("http", f"127.0.0.1:{self.server.server_port}", "user", "pass")
+
+    def tearDown(self):
+        self.client.httpConnection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_singleCall(self):
+        self.assertEqual(self.client.getBlockCount(), 1000)
+        self.assertEqual(self.server.calls, ['getblockcount'])
+
+    def test_getRawTransactions(self):
+        txids = ["aa" * 32, "cc" * 32, "bb" * 32]
+        res = self.client.getRawTransactions(txids, batch_size=2)
+        # missing tx skipped, two batch requests
+        self.assertEqual(res, {"aa" * 32: "0100", "bb" * 32: "0200"})
+        self.assertEqual(self.server.num_of_requests, 2)
+        self.assertEqual(len(self.server.calls), 3)
+
+    def test_batch(self):
+        batch = self.client.batch()
+        batch.add('getblockcount')
+        batch.add('getrawtransaction', "cc" * 32)
+        batch.add('getrawtransaction', "bb" * 32)
+        results = batch.execute()
+        self.assertEqual(self.server.num_of_requests, 1)
+        self.assertEqual(results[0], (1000, None))
+        # per-item error
+        self.assertIsNone(results[1][0])
+        self.assertEqual(results[1][1]['code'], -5)
+        self.assertEqual(results[2], ("0200", None))
+
+    def test_batchFailure(self):
+        self.tearDown()
+        batch = self.client.batch()
+        batch.add('getblockcount')
+        batch.add('getinfo')
+        self.assertEqual([err['code'] for _, err in batch.execute()], [-342, -342])
+        self.setUp()
+
+    def test_batchError(self):
+        self.server.batch_error = True
+        with self.assertRaises(JSONRPCException) as cm:
+            self.client.sendBatch([['getblockcount'], ['getinfo']])
+        self.assertEqual(cm.exception.code, -32700)
+        # handled by executeBatch: per-call errors of the failed request
+        batch = self.client.batch()
+        batch.add('getblockcount')
+        self.assertEqual(batch.execute()[0][1]['code'], -342)
+        # connection still usable
+        self.server.batch_error = False
+        self.assertEqual(self.client.getBlockCount(), 1000)
+        self.assertEqual(self.server.num_of_connections, 1)
+        # batch requests sent to the path of the single calls
+        self.assertEqual(set(self.server.paths), {self.client.url_path})
+
+    def test_getStatus(self):
+        status, _, n, response_time, isTestnet, isSynced = self.client.getStatus()
+        self.assertTrue(status and isTestnet and isSynced)
+        self.assertEqual(n, 1000)
+        self.assertIsNotNone(response_time)
+        self.assertEqual(self.server.num_of_requests, 1)
+        # connection dropped by the server: reconnection (the batch exception is not swallowed)
+        self.server.drop_connection = True
+        self.client.getStatus()
+        self.assertTrue(self.client.getStatus()[0])
+        self.assertEqual(self.server.num_of_connections, 2)
+        # server down: default status
+        self.tearDown()
+        self.assertFalse(self.client.getStatus()[0])
+        self.setUp()
+
+    def test_proposalsAndMnCount(self):
+        proposals, mnCount = self.client.getProposalsAndMnCount()
+        self.assertEqual(proposals[0].name, 'prop1')
+        # getmasternodecount not available
+        self.assertIsNone(mnCount)
+        self.assertEqual(self.client.getProtocolVersionAndHeight(), (70920, 1000))
+        # plus the chain tip check of the cache
+        self.assertEqual(self.server.num_of_requests, 3)
+        # partial result (masternode count missing) not cached for the block
+        self.client.getProposalsAndMnCount()
+        self.assertEqual(self.server.calls.count('getbudgetinfo'), 2)
+        self.assertEqual(self.client.getCacheStats()['hits'], 0)
+
+    def test_getMasternodes(self):
+        mnList = self.client.getMasternodes()
+        self.assertEqual(len(mnList['masternodes']), 10)
+        # height of the server returning the list (same batch request)
+        self.assertEqual(mnList['height'], 1000)
+        self.assertEqual(self.server.num_of_requests, 1)
+        # queue positions by decreasing score (activetime), disabled ones last
+        positions = [mn['queue_pos'] for mn in mnList['masternodes']]
+        self.assertEqual(sorted(positions), list(range(10)))
+        self.assertEqual(mnList['masternodes'][8]['queue_pos'], 0)
+        self.assertEqual(mnList['masternodes'][1]['queue_pos'], 5)
+        # indexes
+        mn = mnList['by_outpoint'][(f"{7:064x}", 1)]
+        self.assertEqual(mn['addr'], "addr7")
+        self.assertIs(mnList['by_address']["addr7"], mn)
+        self.assertNotIn((f"{7:064x}", 0), mnList['by_outpoint'])
+
+    def test_keepAlive(self):
+        for _ in range(4):
+            self.assertEqual(self.client.getBlockCount(), 1000)
+        self.assertEqual(self.server.num_of_connections, 1)
+        self.assertEqual(self.client.getConnectionStats(), {'calls': 4, 'handshakes': 1, 'reuse_ratio': 0.75})
+
+    def test_reconnect(self):
+        self.server.drop_connection = True
+        self.assertEqual(self.client.getBlockCount(), 1000)
+        # connection closed by the server: transparent reconnection
+        self.assertEqual(self.client.getBlockCount(), 1000)
+        self.assertEqual(self.client.getRawTransactions(["aa" * 32]), {"aa" * 32: "0100"})
+        self.assertEqual(self.server.num_of_connections, 2)
+        self.assertEqual(self.client.getConnectionStats()['handshakes'], 2)
+
+    def test_cacheByBlock(self):
+        self.assertEqual(self.client.getFeePerKb(), 0.0002)
+        self.assertEqual(self.client.getFeePerKb(), 0.0002)
+        self.assertEqual(self.server.calls, ['getblockcount', 'getfeeinfo'])
+        # explicit bypass
+        self.client.getFeePerKb(bypassCache=True)
+        self.assertEqual(self.server.calls.count('getfeeinfo'), 2)
+        # new block (the tip is checked again after RPC_CACHE_TIP_MAX_AGE)
+        self.server.height += 1
+        self.client.getFeePerKb()
+        self.assertEqual(self.server.calls.count('getfeeinfo'), 2)
+        self.client.tipTime = 0
+        self.client.getFeePerKb()
+        self.assertEqual(self.server.calls.count('getfeeinfo'), 3)
+        # invalidation
+        self.client.invalidateCache('getFeePerKb')
+        self.client.getFeePerKb()
+        self.assertEqual(self.server.calls.count('getfeeinfo'), 4)
+        stats = self.client.getCacheStats()
+        self.assertEqual((stats['height'], stats['hits'], stats['misses'], stats['bypasses']), (1001, 2, 3, 1))
+
+    if __name__ == '__main__':
+        unittest.main(verbosity=2)
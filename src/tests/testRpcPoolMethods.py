@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+import threading
+import time
+import unittest
+from rpcPool import RpcPool
+from testRpcClientMethods import startDummyNode
+
+
+class TestRpcPoolMethods(unittest.TestCase):
+    def setUp(self):
+        # fast, slow and behind-the-tip servers
+        self.servers = [startDummyNode(), startDummyNode(delay=0.2), startDummyNode(height=990)]
+        self.pool = RpcPool()
+        self.pool.setServers([self.serverData(s) for s in self.servers])
+        preferred = self.getNode(self.servers[1])
+        preferred.probe()
+        self.pool.setPreferred(preferred)
+        self.pool.refresh()
+
+    def tearDown(self):
+        for node in self.pool.nodes.values():
+            node.client.httpConnection.close()
+        for s in self.servers:
+            s.shutdown()
+            s.server_close()
+
+    def serverData(self, server):
+        return {'protocol': "http", 'host': f"127.0.0.1:{server.server_port}", 'user': "user", 'password': "pass"}
+
+    def getNode(self, server):
+        s = self.serverData(server)
+        return self.pool.getNode(s['protocol'], s['host'], s['user'], s['password'])
+
+    def test_routing(self):
+        # read-only call sent to the fastest server at the tip
+        self.assertEqual(self.pool.getBlockCount(), 1000)
+        self.assertEqual(self.servers[0].calls[-1], 'getblockcount')
+        self.assertEqual(self.servers[1].calls, ['getinfo', 'getblockcount', 'mnsync'])
+        self.assertNotIn(self.getNode(self.servers[2]), self.pool.healthyNodes())
+
+    def test_failover(self):
+        self.servers[0].shutdown()
+        self.servers[0].server_close()
+        self.getNode(self.servers[0]).client.httpConnection.close()
+        self.assertEqual(self.pool.getBlockCount(), 1000)
+        self.assertEqual(self.servers[1].calls[-1], 'getblockcount')
+        self.assertGreater(self.getNode(self.servers[0]).error_rate, 0)
+
+    def test_fanOut(self):
+        # first answer returned without waiting for the slow server
+        start = time.time()
+        self.assertEqual(self.pool.sendRawTransaction("0100"), "ff" * 32)
+        self.assertLess(time.time() - start, 0.2)
+        time.sleep(0.4)
+        # sent to the healthy servers only
+        self.assertEqual(self.servers[0].calls[-1], 'sendrawtransaction')
+        self.assertEqual(self.servers[1].calls[-1], 'sendrawtransaction')
+        self.assertNotIn('sendrawtransaction', self.servers[2].calls)
+
+    def test_refreshNoWait(self):
+        self.servers[0].delay = 1
+        start = time.time()
+        self.pool.refresh(wait=False)
+        self.assertLess(time.time() - start, 0.2)
+        self.assertIn('probe', self.getNode(self.servers[0]).tasks)
+        # probe completed in the background
+        time.sleep(1.2)
+        self.assertEqual(self.getNode(self.servers[0]).tasks, set())
+
+    def test_unresponsiveNode(self):
+        # fast server stops answering
+        hung_node = self.getNode(self.servers[0])
+        self.servers[0].delay = 30
+        num_of_threads = threading.active_count()
+        for _ in range(5):
+            self.pool.refresh(timeout=0.05)
+            self.pool.sendRawTransaction("0100")
+        time.sleep(0.5)
+        # a single probe and a single write left blocked on it
+        self.assertEqual(hung_node.tasks, {'probe', 'write'})
+        self.assertLessEqual(threading.active_count(), num_of_threads + 2)
+
+    if __name__ == '__main__':
+        unittest.main(verbosity=2)
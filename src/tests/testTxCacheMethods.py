@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (c) 2017-2019 Random.Zebra (https://github.com/random-zebra/)
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
+
+import os
+import tempfile
+import unittest
+from constants import TXCACHE_MEM_SIZE
+from database import Database
+from testDatabaseMethods import DummyApp
+from txCache import MemoryLRU, TxCache, memCache
+
+
+class DummyRpcClient():
+    def __init__(self):
+        self.calls = 0
+
+    def getRawTransaction(self, txid):
+        self.calls += 1
+        return txid * 2
+
+    def getRawTransactions(self, txids):
+        self.calls += 1
+        # last one not found
+        return {txid: txid * 2 for txid in txids[:-1]}
+
+
+class DummyMainWnd():
+    def __init__(self, db):
+        self.parent = DummyApp()
+        self.parent.db = db
+        self.rpcClient = DummyRpcClient()
+
+
+class TestTxCacheMethods(unittest.TestCase):
+    def setUp(self):
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.db = Database(DummyApp(), os.path.join(self.tmpDir.name, 'test.db'))
+        self.db.openDB()
+        memCache.clear()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpDir.cleanup()
+
+    def test_memoryLRU(self):
+        lru = MemoryLRU(2)
+        lru.put("a", 1)
+        lru.put("b", 2)
+        self.assertEqual(lru.get("a"), 1)
+        lru.put("c", 3)
+        # "b" was the least recently used
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("c"), 3)
+        self.assertEqual(lru.stats(), {'size': 2, 'hits': 2, 'misses': 1, 'evictions': 1})
+
+    def test_fetchOnce(self):
+        main_wnd = DummyMainWnd(self.db)
+        txid = "ab" * 32
+        # fetched from rpc once, then served from memory by every TxCache instance
+        for _ in range(3):
+            self.assertEqual(TxCache(main_wnd)[txid], bytes.fromhex(txid * 2))
+        self.assertEqual(main_wnd.rpcClient.calls, 1)
+        self.assertEqual(self.db.getRawTx(txid)['rawtx'], bytes.fromhex(txid * 2))
+        # stored txes are loaded into memory at the first access
+        self.db.addRawTx("cd" * 32, b"\x01\x02")
+        self.assertEqual(TxCache(main_wnd)["cd" * 32], b"\x01\x02")
+        self.assertEqual(memCache.get("cd" * 32), b"\x01\x02")
+        self.assertEqual(main_wnd.rpcClient.calls, 1)
+
+    def test_prefetch(self):
+        main_wnd = DummyMainWnd(self.db)
+        txids = [f"{i:064x}" for i in range(10)]
+        self.db.addRawTx(txids[0], b"\x01")
+        rawtxes = TxCache(main_wnd).prefetch(txids + txids[1:3])
+        # a single rpc call for the txes not in the database
+        self.assertEqual(main_wnd.rpcClient.calls, 1)
+        self.assertEqual(rawtxes[txids[0]], b"\x01")
+        self.assertEqual(rawtxes[txids[5]], bytes.fromhex(txids[5] * 2))
+        self.assertEqual(len(self.db.getRawTxes(txids)), 9)
+        self.assertNotIn(txids[-1], rawtxes)
+        # stored txes are not fetched again
+        self.assertEqual(len(TxCache(main_wnd).prefetch(txids[:-1])), 9)
+        self.assertEqual(main_wnd.rpcClient.calls, 1)
+        self.assertEqual(TxCache(main_wnd)[txids[5]], bytes.fromhex(txids[5] * 2))
+        self.assertEqual(main_wnd.rpcClient.calls, 1)
+
+    def test_prefetchTwice(self):
+        main_wnd = DummyMainWnd(self.db)
+        txids = [f"{i:064x}" for i in range(10)]
+        self.db.addRawTxes({txid: bytes.fromhex(txid) for txid in txids[:5]})
+        # rewards loader
+        rawtxes = TxCache(main_wnd).prefetch(txids)
+        self.assertEqual(main_wnd.rpcClient.calls, 1)
+        db_reads = []
+        self.db.getRawTx = lambda tx_hash, lastfetch=None: db_reads.append(tx_hash)
+        self.db.getRawTxes = lambda tx_hashes, lastfetch=None: db_reads.append(tx_hashes) or {}
+        hits = memCache.stats()['hits']
+        # hardware wallet: same txes served from memory
+        self.assertEqual(TxCache(main_wnd).prefetch(txids[:-1]), rawtxes)
+        self.assertEqual(TxCache(main_wnd)[txids[2]], rawtxes[txids[2]])
+        self.assertEqual(memCache.stats()['hits'], hits + 10)
+        self.assertEqual(db_reads, [])
+        self.assertEqual(main_wnd.rpcClient.calls, 1)
+
+    def test_memoryLRUPutMany(self):
+        lru = MemoryLRU(2)
+        lru.put("a", 1)
+        lru.putMany({"b": 2, "c": 3})
+        self.assertNotIn("a", lru)
+        self.assertEqual(lru.get("b"), 2)
+        self.assertEqual(lru.stats(), {'size': 2, 'hits': 1, 'misses': 0, 'evictions': 1})
+
+    def test_prefetchLarge(self):
+        main_wnd = DummyMainWnd(self.db)
+        txids = [f"{i:064x}" for i in range(2 * TXCACHE_MEM_SIZE)]
+        self.db.addRawTxes({txid: bytes.fromhex(txid) for txid in txids})
+        # hot tx already in memory
+        memCache.put(txids[0], b"\x01")
+        single_reads = []
+        self.db.getRawTx = lambda tx_hash, lastfetch=None: single_reads.append(tx_hash)
+        rawtxes = TxCache(main_wnd).prefetch(txids)
+        # whole batch returned, with no per-tx database reads and no rpc calls
+        self.assertEqual(len(rawtxes), len(txids))
+        self.assertEqual(rawtxes[txids[0]], b"\x01")
+        self.assertEqual(rawtxes[txids[-1]], bytes.fromhex(txids[-1]))
+        self.assertEqual(single_reads, [])
+        self.assertEqual(main_wnd.rpcClient.calls, 0)
+        # memory stays bounded: only the last TXCACHE_MEM_SIZE txes of the batch are kept
+        self.assertEqual(memCache.stats()['size'], TXCACHE_MEM_SIZE)
+        self.assertIn(txids[-1], memCache)
+        self.assertNotIn(txids[1], memCache)
+
+    if __name__ == '__main__':
+        unittest.main(verbosity=2)
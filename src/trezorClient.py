@@ -147,11 +147,14 @@ class TrezorApi(QObject):
         curr_utxo_checked = 0
         txes = {}
         num_of_txes = sum([len(mnode['utxos']) for mnode in rewardsArray])
+        rawtxes = TxCache(self.main_wnd).prefetch([utxo['txid'] for mnode in rewardsArray for utxo in mnode['utxos']])
         for mn in rewardsArray:
             for utxo in mn['utxos']:
                 prev_hash = bytes.fromhex(utxo["txid"])
                 if prev_hash not in txes:
-                    raw_tx = TxCache(self.main_wnd)[utxo['txid']]
+                    raw_tx = rawtxes.get(utxo['txid'])
+                    if raw_tx is None:
+                        raise Exception(f"Unable to get raw TX with hash={utxo['txid']}")
                     json_tx = ParseTx(raw_tx)
                     txes[prev_hash] = self.json_to_tx(json_tx)
 
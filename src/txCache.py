@@ -4,24 +4,92 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE.txt or http://www.opensource.org/licenses/mit-license.php.
 
+from collections import OrderedDict
+import threading
 from time import time
 
+from constants import TXCACHE_MEM_SIZE
+
 '''
 Connects with database and rpc clients to keep a cache for rawtxes
 '''
 
 
+class MemoryLRU():
+    """
+    Bounded in-memory LRU (thread safe), with hit / miss / eviction counters
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    def putMany(self, items):
+        # dictionary key -> value, inserted under a single lock (the last ones are the most recent)
+        with self.lock:
+            for key, value in items.items():
+                self.items[key] = value
+                self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.items), 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+
+# Raw txes of the session, shared by all the TxCache instances.
+# Filled by single lookups and by TxCache.prefetch (the rewards loader), and read again
+# by the hardware wallets when the same txes are spent.
+memCache = MemoryLRU(TXCACHE_MEM_SIZE)
+
+
 class TxCache():
 
     def __init__(self, main_wnd):
         self.main_wnd = main_wnd
 
     '''
-    tries to fetch rawtx from database.
+    tries to fetch rawtx (bytes) from memory, then from database.
     if not found, tries with rpc (and if successful, updates the database)
     '''
     def __getitem__(self, item):
-        rawtx = self.main_wnd.parent.db.getRawTx(item)
+        rawtx = memCache.get(item)
+        if rawtx is not None:
+            return rawtx
+
+        rawtx = self.main_wnd.parent.db.getRawTx(item, time())
         if rawtx is None:
             # double check that the rpc connection is still active, else reconnect
             if self.main_wnd.rpcClient is None:
@@ -31,8 +99,51 @@ class TxCache():
 
             # update DB
             if rawtx is not None:
+                rawtx = bytes.fromhex(rawtx)
                 self.main_wnd.parent.db.addRawTx(item, rawtx, time())
         else:
             rawtx = rawtx['rawtx']
 
+        if rawtx is not None:
+            memCache.put(item, rawtx)
+
         return rawtx
+
+    def prefetch(self, txids):
+        """
+        loads a batch of txes: from memory and from the database, or, for the missing ones,
+        from rpc with batch requests (then stored in the database in a single transaction).
+        returns the dictionary txid -> rawtx (bytes) of the txes found.
+        The txes loaded from the database or rpc are copied to memCache, so that the next
+        lookups of the batch (e.g. the hardware wallet after the rewards loader) hit memory.
+        """
+        rawtxes = {}
+        missing = []
+        for txid in dict.fromkeys(txids):
+            rawtx = memCache.get(txid)
+            if rawtx is not None:
+                rawtxes[txid] = rawtx
+            else:
+                missing.append(txid)
+        if len(missing) == 0:
+            return rawtxes
+
+        stored = self.main_wnd.parent.db.getRawTxes(missing, time())
+        memCache.putMany(stored)
+        rawtxes.update(stored)
+        missing = [txid for txid in missing if txid not in rawtxes]
+        if len(missing) == 0:
+            return rawtxes
+
+        # double check that the rpc connection is still active, else reconnect
+        if self.main_wnd.rpcClient is None:
+            self.main_wnd.updateRPCstatus(None)
+
+        fetched = self.main_wnd.rpcClient.getRawTransactions(missing)
+        if fetched:
+            fetched = {txid: bytes.fromhex(fetched[txid]) for txid in fetched}
+            self.main_wnd.parent.db.addRawTxes(fetched, time())
+            memCache.putMany(fetched)
+            rawtxes.update(fetched)
+
+        return rawtxes